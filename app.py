@@ -1,14 +1,15 @@
 import streamlit as st
-import pandas as pd
-from joblib import load
+from timing import RunTimer, report_enabled
+import metrics
 from streamlit_lottie import st_lottie
 from streamlit_option_menu import option_menu
-from plotly.express import histogram,box,sunburst,scatter_mapbox
 import json
-from sklearn.preprocessing import OrdinalEncoder
+import logging
+import os
+from uuid import uuid4
 from datetime import datetime
-from fpdf import FPDF
-from streamlit_gsheets import GSheetsConnection
+
+timer = RunTimer()
 
 #Layout
 st.set_page_config(
@@ -17,32 +18,120 @@ st.set_page_config(
     page_icon="logo.jpg",
     initial_sidebar_state="auto")
 
+#Heavy libraries and resources are imported and loaded by the pages that use them
+#metrics.cached counts each cache hit/miss and times every (re)load as a span
 
 @st.cache_data
 def load_lottiefile(filepath: str):
     with open(filepath,"r") as f:
         return json.load(f)
 
-@st.cache_resource
+@metrics.cached("model", st.cache_resource)
 def model(model):
+    from joblib import load
     final_model = load(model)
     return final_model
 
-@st.cache_data(show_spinner="Loading visuals...")
+#Read-only artifacts published by shared.py for multi-process deployments (SILENT_HEART_SHARED)
+@st.cache_resource
+def shared_resources():
+    from shared import attach
+    return attach()
+
+@st.cache_resource
+def encoder():
+    from encoding import FeatureEncoder
+    return FeatureEncoder()
+
+@metrics.cached("risk scorer", st.cache_resource)
+def risk_scorer():
+    from registry import ModelRegistry
+    from scoring import RiskScorer
+    #Swaps in versions published by train.py without a restart; until the first one, the shared tree
+    #arrays of a multi-process deployment, or model.joblib
+    if shared_resources():
+        return ModelRegistry(encoder=encoder(), fallback=lambda: shared_resources().scorer(encoder()))
+    return ModelRegistry(encoder=encoder(), fallback=lambda: RiskScorer(model('model.joblib'), encoder()))
+
+#Optional HTTP inference service embedded in this process (SILENT_HEART_SERVICE_PORT)
+@st.cache_resource
+def inference_service(port):
+    from service import start_in_thread
+    return start_in_thread(risk_scorer(), port)
+
+#cache_resource shares one read-only copy instead of unpickling a new one per rerun
+@metrics.cached("dataset", st.cache_resource(show_spinner="Loading visuals..."))
 def load_data(url):
-    df = pd.read_csv(url)
+    from data import load_dataset
+    if shared_resources():
+        return shared_resources().dataset()
+    df = load_dataset(url)
     return df
 
+@st.cache_resource
+def data_version(url):
+    from data import file_hash
+    if shared_resources():
+        return shared_resources().manifest['dataset_version']
+    return file_hash(url)[:16]
+
+#Peer-group percentiles, built once per dataset version
+@metrics.cached("cohort index", st.cache_resource(show_spinner="Loading statistics..."))
+def cohort_index(url, version):
+    from cohort import CohortIndex
+    return CohortIndex.build(load_data(url))
+
+@metrics.cached("dashboard summary", st.cache_data(persist="disk", show_spinner="Loading visuals..."))
+def dashboard_summary(url, version):
+    from dashboard import summarize
+    return summarize(load_data(url))
+
+#Cardiologist directory, parsed once per process with a per-state index
+@metrics.cached("doctor directory", st.cache_resource(show_spinner="Loading doctors..."))
+def doctor_directory(path):
+    from doctors import DoctorDirectory
+    if shared_resources():
+        return DoctorDirectory(shared_resources().doctors())
+    return DoctorDirectory.from_file(path)
+
+@metrics.cached("india map", st.cache_resource(show_spinner="Loading map..."))
+def india_map(path):
+    from doctors import doctor_map
+    return doctor_map(doctor_directory(path).table, zoom=4, hover_data=("State","Address"))
+
+#Counterfactual grid per patient and model version; reruns of the what-if section only read it.
+#The scorer is not hashed: ``version`` names the model it holds
+@metrics.cached("what-if grid", st.cache_data(max_entries=256))
+def what_if_grid(row, encoded, version, _scorer):
+    from whatif import simulate
+    return simulate(row, encoded, _scorer)
 
-final_model = model('model.joblib')
-odf = load_data("CVD_cleaned.csv")
+@st.cache_resource
+def report_renderer():
+    from reports import ReportRenderer
+    return ReportRenderer()
 
-#Gsheets connection
-conn = st.connection("gsheets", type=GSheetsConnection)
-existing_data = conn.read(worksheet="Record",usecols=list(range(20)),ttl="5m")
-existing_data=existing_data.dropna(how="all")
-existing_data_validation=conn.read(worksheet="Validation",usecols=list(range(5)),ttl="5m")
-existing_data_validation=existing_data_validation.dropna(how="all")
+#Record storage (Google Sheets or local SQLite), opened on first use
+@st.cache_resource
+def record_store():
+    from storage import open_store
+    return open_store()
+
+#Rows are spooled locally and appended to the store in batches by a background worker
+@st.cache_resource
+def record_queue():
+    from writebehind import WriteBehindQueue
+    return WriteBehindQueue(record_store().append).start()
+
+#Prometheus-style /metrics endpoint for this process (SILENT_HEART_METRICS_PORT)
+@st.cache_resource
+def metrics_server(port):
+    return metrics.serve(port)
+
+if os.environ.get("SILENT_HEART_SERVICE_PORT"):
+    inference_service(int(os.environ["SILENT_HEART_SERVICE_PORT"]))
+if os.environ.get("SILENT_HEART_METRICS_PORT"):
+    metrics_server(int(os.environ["SILENT_HEART_METRICS_PORT"]))
 
 # # Hide the github icon on the right side in the deployed app
 # hide_github_icon = """
@@ -52,9 +141,13 @@ existing_data_validation=existing_data_validation.dropna(how="all")
 # """
 # st.markdown(hide_github_icon, unsafe_allow_html=True)
 
+pages = ["Home", 'Prediction','Find a Doctor','About']
+#?page=Prediction opens a page directly (also used by the headless load tests)
+start_page = st.query_params.get("page")
 with st.sidebar:
-    selected = option_menu('Silent Heart', ["Home", 'Prediction','Find a Doctor','About'], 
-        icons=['house','activity','geo-alt','info-circle'],menu_icon='heart-pulse', default_index=0)
+    selected = option_menu('Silent Heart', pages, 
+        icons=['house','activity','geo-alt','info-circle'],menu_icon='heart-pulse',
+        default_index=pages.index(start_page) if start_page in pages else 0)
     lottie = load_lottiefile("heartanimation.json")
     st_lottie(lottie,key='loc')
 
@@ -78,57 +171,21 @@ if selected=="Home":
         col1.metric("People affected by CVD", "620 M", "8 %",delta_color='inverse')
         col2.metric("Deaths", "20.5 M", "1.2 %",delta_color='inverse')
         col3.metric("Waiting time for surgery", "7 days", "- 8 days",delta_color='inverse')
+        with timer.stage("imports"):
+            from dashboard import smoking_figure, bmi_box_figure, sunburst_figure, bmi_histogram_figure, SUMMARY_VERSION
+        with timer.stage("dashboard summary"):
+            summary = dashboard_summary("CVD_cleaned.csv", f"{data_version('CVD_cleaned.csv')}-{SUMMARY_VERSION}")
         #Viz1
-        @st.cache_data(show_spinner="Loading visuals...")
-        def viz1():
-            viz1 = histogram(odf, x="Smoking_History", color='Heart_Disease', barmode='group',
-                            title="Smoking history vs Heart Disease",
-                            labels={
-                     "Smoking_History": "Smoking History",
-                     "Heart_Disease": "Heart Disease"
-                                    },
-                            category_orders={"Smoking_History": ["Yes", "No"]}) 
-            st.plotly_chart(viz1,theme="streamlit",use_column_width=True)
-        
-        viz1()
+        st.plotly_chart(smoking_figure(summary),theme="streamlit",use_column_width=True)
 
         #Viz2
-        @st.cache_data(show_spinner="Loading visuals...")
-        def viz2():
-            viz2 = box(odf,
-                    x="Alcohol_Consumption",
-                    y="BMI",
-                    color="Heart_Disease",
-                     labels={
-                     "Alcohol_Consumption": "Alcohol Consumption",
-                     "Heart_Disease": "Heart Disease",
-                     "BMI":"BMI"
-                                    },
-                    title="BMI Distribution across Alcohol Consumption on Heart Disease Status",
-                    category_orders={"Alcohol_Consumption": ["Yes", "No"]})
-            st.plotly_chart(viz2,theme="streamlit",use_column_width=True)
-
-        viz2()
-
+        st.plotly_chart(bmi_box_figure(summary),theme="streamlit",use_column_width=True)
 
         #Viz3
-        @st.cache_data(show_spinner="Loading visuals...")
-        def viz3():
-            viz3 = sunburst(odf, path=['Sex','Heart_Disease' ,'Age_Category'],values='Alcohol_Consumption', color='Alcohol_Consumption',labels={
-                     "Alcohol_Consumption": "Alcohol Consumption"
-                                    },title='Analysis of Sex, Age category and the presence of Heart disease')
-            st.plotly_chart(viz3,theme="streamlit",use_column_width=True)
-        
-        viz3()
+        st.plotly_chart(sunburst_figure(summary),theme="streamlit",use_column_width=True)
 
         #Viz4
-        @st.cache_data(show_spinner="Loading visuals...")
-        def viz4():
-            viz4 = histogram(odf, x="BMI", color="Heart_Disease",
-                            labels={"Heart_Disease":"Heart Disease"},title="BMI vs Heart Disease",nbins=30)
-            st.plotly_chart(viz4,theme="streamlit",use_column_width=True)
-        
-        viz4()
+        st.plotly_chart(bmi_histogram_figure(summary),theme="streamlit",use_column_width=True)
 
 
     with tab2:
@@ -182,365 +239,348 @@ if selected=="Home":
 predict = st.container()
 results = st.container()
 if selected=="Prediction":
+    with timer.stage("imports"):
+        import pandas as pd
+        from cohort import ordinal
+        from features import prepare
+
+    #Runs on its own: submitting a validation reruns only this fragment, not the prediction pipeline
+    @st.fragment
+    def doctor_validation(prediction):
+        fragment_timer = RunTimer()
+        inputs, risk = prediction['inputs'], prediction['risk']
+        with st.form("validation",border=False):
+            doctorname=st.text_input("Enter Doctor's Name")
+            doctoropinion = st.radio('What is the risk of patient developing Cardiovascular Disease (CVD)?',
+                            ('LOW','HIGH'),horizontal=True,index=None)
+            validate = st.form_submit_button("Submit validation")
+        if validate:
+            if doctoropinion is None or not doctorname:
+                st.error("Please enter your name and your assessment")
+            else:
+                validationdata = {'Patient Name': inputs['Name'],
+                        'Model output': risk,
+                        'Doctor output': doctoropinion,
+                        'Validation': "Correct" if risk==doctoropinion else "Wrong",
+                        'Doctor Name': doctorname,
+                        'Submission ID': prediction['submission_id']
+                        }
+                with fragment_timer.stage("record"):
+                    #Same key per prediction: a corrected validation replaces the pending one
+                    record_queue().put("Validation",validationdata,key=f"{prediction['submission_id']}:Validation")
+                st.success(f"Thank you Dr.{doctorname} for validating our model!")
+        total = next(row for row in fragment_timer.finish("Prediction: validation") if row['stage'] == "total")
+        if report_enabled():
+            st.caption(f"Validation: {total['seconds'] * 1000:.1f} ms, {total['cpu_seconds'] * 1000:.1f} ms CPU")
+
+    #Sliders rerun only this fragment; every scenario is looked up in the precomputed grid
+    @st.fragment
+    def what_if(prediction):
+        from whatif import levels, lookup, own, sensitivity
+        fragment_timer = RunTimer()
+        row = {col: value for col, value in prediction['inputs'].items() if col != 'Name'}
+        with fragment_timer.stage("what-if grid"):
+            version, scorer = risk_scorer().versioned()
+            variants = what_if_grid(row, prediction['encoded'], version, scorer)
+        options = levels(row)
+        col1,col2=st.columns(2)
+        scenario = {'Smoking_History': col1.radio('Smoking',options['Smoking_History'],horizontal=True,
+                                                  index=options['Smoking_History'].index(row['Smoking_History'])),
+                    'Exercise': col2.radio('Exercise',options['Exercise'],horizontal=True,
+                                           index=options['Exercise'].index(row['Exercise'])),
+                    'BMI': col1.select_slider('BMI',options['BMI'].tolist(),value=float(row['BMI']),
+                                              format_func=lambda value: f"{value:g}"),
+                    'Alcohol_Consumption': col2.select_slider('Days with alcohol in the past 30 days',
+                                                              options['Alcohol_Consumption'].tolist(),
+                                                              value=float(row['Alcohol_Consumption']),
+                                                              format_func=lambda value: f"{value:g}")}
+        risk = lookup(variants, scenario)
+        #Compared with the same in-process model (the prediction itself may come from the inference service)
+        baseline = lookup(variants, own(row))
+        weight = float(variants.loc[variants['BMI'] == scenario['BMI'], 'Weight_(kg)'].iloc[0])
+        st.metric("Estimated risk score in this scenario",f"{risk:.1%}",
+                  delta=f"{(risk - baseline) * 100:+.1f} points",delta_color="inverse")
+        st.caption(f"At your height, a BMI of {scenario['BMI']:g} is a weight of about {weight:g} kg. "
+                   f"Simulated {len(variants):,} combinations of these answers.")
+        st.write("**How each change alone moves your risk score**")
+        curves = sensitivity(variants, row)
+        col1,col2=st.columns(2)
+        col1.bar_chart(curves['Smoking_History'].rename("Risk score"))
+        col2.bar_chart(curves['Exercise'].rename("Risk score"))
+        col1.line_chart(curves['BMI'].rename("Risk score"))
+        col2.line_chart(curves['Alcohol_Consumption'].rename("Risk score"))
+        total = next(row for row in fragment_timer.finish("Prediction: what-if") if row['stage'] == "total")
+        if report_enabled():
+            st.caption(f"What-if: {total['seconds'] * 1000:.1f} ms, {total['cpu_seconds'] * 1000:.1f} ms CPU")
+
     with predict:
         st.title(":red[Cardiovascular Disease Prediction]")
         st.subheader('Fill out the following:')
-        name = st.text_input('Enter your Name')
-        st.write('**Demographic and Screening Questions**')
-        Age_Category = st.selectbox('In what Age category do you belong?',('Select One','18-24',
-                                                                            '25-29',
-                                                                            '30-34',
-                                                                            '35-39',
-                                                                            '40-44',
-                                                                            '45-49',
-                                                                            '50-54',
-                                                                            '55-59',
-                                                                            '60-64',
-                                                                            '65-69',
-                                                                            '70-74',
-                                                                            '75-79',
-                                                                            '80+'))
+        #Answers are only sent on Predict, so filling in the form does not rerun the app
+        #The form's key must differ from the "prediction" session-state key holding the result
+        with st.form("prediction_form",border=False):
+            name = st.text_input('Enter your Name')
+            st.write('**Demographic and Screening Questions**')
+            Age_Category = st.selectbox('In what Age category do you belong?',('Select One','18-24',
+                                                                                '25-29',
+                                                                                '30-34',
+                                                                                '35-39',
+                                                                                '40-44',
+                                                                                '45-49',
+                                                                                '50-54',
+                                                                                '55-59',
+                                                                                '60-64',
+                                                                                '65-69',
+                                                                                '70-74',
+                                                                                '75-79',
+                                                                                '80+'))
                                                     
-        Sex = st.selectbox('Sex',('Select One','Male','Female'))
-
-        Height = st.selectbox('How tall are you?',('Feet and Inches','Centimeters'))
-
-        if Height == 'Feet and Inches':
-            Feet = st.selectbox('Feet',('Feet',3,4,5,6,7),label_visibility="collapsed")
-            Inches = st.selectbox('Inches',('Inches',0,1,2,3,4,5,6,7,8,9,10,11),label_visibility="collapsed")
-            if Feet != 'Feet' and Inches != 'Inches':
-                Height_cm = ((Feet * 12) + Inches) * 2.54         
-        else:
-            Height_cm = st.number_input('How tall are you in cm?',min_value=25,max_value=300,step=10)
+            Sex = st.selectbox('Sex',('Select One','Male','Female'))
+
+            #Placeholders ('Feet', 'Select One', ...) are left in and rejected by features.prepare
+            st.write('How tall are you?')
+            col1,col2,col3=st.columns(3)
+            Feet = col1.selectbox('Feet',('Feet',3,4,5,6,7),label_visibility="collapsed")
+            Inches = col2.selectbox('Inches',('Inches',0,1,2,3,4,5,6,7,8,9,10,11),label_visibility="collapsed")
+            #Centimeters, when given, take precedence over feet and inches
+            Height_cm = col3.number_input('How tall are you in cm?',min_value=25,max_value=300,step=10,value=None,
+                                          placeholder="or centimeters",label_visibility="collapsed")
     
-        Weight_kg = st.number_input('Weight (kg)',min_value=25.00,max_value=300.00,step=10.00)
+            Weight_kg = st.number_input('Weight (kg)',min_value=25.00,max_value=300.00,step=10.00)
                       
-        Smoking_History = st.radio('Have you smoked at least 100 cigarettes in your entire life?',
-                                    ('No','Yes'),horizontal=True)
-
-        st.write('**Health Status**')
-        General_Health = st.selectbox('Would you say that in general, your health is',('Select One',
-                                                                            'Poor',
-                                                                            'Fair',
-                                                                            'Good',
-                                                                            'Very Good',
-                                                                            'Excellent'
-                                                                                    ))
-        st.write('**Health Care Access**')
-        Checkup = st.selectbox('About how long has it been since you \
-                                    last visited a doctor for a routine checkup?',('Select One',
-                                                                            'Within the past year',
-                                                                            'Within the past 2 years',
-                                                                            'Within the past 5 years',
-                                                                            '5 or more years ago',
-                                                                            'Never'
-                                                                                    ))
-
-        st.write('**Exercise**')
-        Exercise = st.radio('During the past month, other than your regular job, did you participate in any physical activities or exercises such as running, calisthenics, golf, gardening, or walking for exercise?',
-                                    ('Yes','No'),horizontal=True)
-
-        st.write('**Health Conditions**')
-        st.write('Have you ever been diagnosed with any of the following?')
-        Depression = st.radio('Have you been diagnosed with a depressive disorder such as depression, major depression, dysthymia, or minor depression?',
-                                    ('No','Yes'),horizontal=True)
-        Diabetes = st.radio('Have you been diagnosed with diabetes?',
-                                    ('No','Yes'),horizontal=True)
-        Arthritis = st.radio('Have you been diagnosed with some form of arthritis, rheumatoid arthritis, gout, lupus, or fibromyalgia?',
-                                    ('No','Yes'),horizontal=True)
-        Skin_Cancer = st.radio('Have you been diagnosed with skin cancer?',
-                                    ('No','Yes'),horizontal=True)
-        Other_Cancer = st.radio('Have you been diagnosed with any other types of cancer?',
-                                    ('No','Yes'),horizontal=True)
-        
-        st.write('**Food and Drink Consumption**')
-
-        Alcohol_Consumption = st.slider(
-                                'During the past 30 days, how many days \
-                                did you have at least one drink of any alcoholic beverage such \
-                                as beer, wine, a malt beverage or liquor?',
-                                0, 30,step=1)
+            Smoking_History = st.radio('Have you smoked at least 100 cigarettes in your entire life?',
+                                        ('No','Yes'),horizontal=True)
+
+            st.write('**Health Status**')
+            General_Health = st.selectbox('Would you say that in general, your health is',('Select One',
+                                                                                'Poor',
+                                                                                'Fair',
+                                                                                'Good',
+                                                                                'Very Good',
+                                                                                'Excellent'
+                                                                                        ))
+            st.write('**Health Care Access**')
+            Checkup = st.selectbox('About how long has it been since you \
+                                        last visited a doctor for a routine checkup?',('Select One',
+                                                                                'Within the past year',
+                                                                                'Within the past 2 years',
+                                                                                'Within the past 5 years',
+                                                                                '5 or more years ago',
+                                                                                'Never'
+                                                                                        ))
+
+            st.write('**Exercise**')
+            Exercise = st.radio('During the past month, other than your regular job, did you participate in any physical activities or exercises such as running, calisthenics, golf, gardening, or walking for exercise?',
+                                        ('Yes','No'),horizontal=True)
+
+            st.write('**Health Conditions**')
+            st.write('Have you ever been diagnosed with any of the following?')
+            Depression = st.radio('Have you been diagnosed with a depressive disorder such as depression, major depression, dysthymia, or minor depression?',
+                                        ('No','Yes'),horizontal=True)
+            Diabetes = st.radio('Have you been diagnosed with diabetes?',
+                                        ('No','Yes'),horizontal=True)
+            Arthritis = st.radio('Have you been diagnosed with some form of arthritis, rheumatoid arthritis, gout, lupus, or fibromyalgia?',
+                                        ('No','Yes'),horizontal=True)
+            Skin_Cancer = st.radio('Have you been diagnosed with skin cancer?',
+                                        ('No','Yes'),horizontal=True)
+            Other_Cancer = st.radio('Have you been diagnosed with any other types of cancer?',
+                                        ('No','Yes'),horizontal=True)
         
-        st.write('Think about the food you ate during the past 30 days, including meals and snacks.')
+            st.write('**Food and Drink Consumption**')
 
-        fruit = st.selectbox('Not including juices, how often do you eat a fruit?',('Select One','Per Day',
-                                                                                'Per Week',
-                                                                                'Per Month'))
-
-        if fruit == 'Per Day':
-            fruit_day = st.selectbox('Day',('How many times do you eat fruit per day?',0,1,2,3,4,5),label_visibility="collapsed")
-
-            if fruit_day != 'How many times do you eat fruit per day?':
-                Fruit_Consumption = fruit_day*30
-        
-        elif fruit == 'Per Week':
-            fruit_week = st.selectbox('Day',('How many times do you eat fruit per week?',0,1,2,3,4,5),label_visibility="collapsed")
-            if fruit_week != 'How many times do you eat fruit per week?':
-                Fruit_Consumption = fruit_week *4
-        elif fruit == 'Per Month':
-            fruit_month = st.selectbox('Day',('How many times do you eat fruit per month?',0,1,2,3,4,5),label_visibility="collapsed")
-            if fruit_month != 'How many times do you eat fruit per month?':
-                Fruit_Consumption = fruit_month
-
-        green_veg = st.selectbox('How often do you eat a green leafy or lettuce salad, with or without other vegetables?',('Select One','Per Day',
-                                                                                'Per Week',
-                                                                                'Per Month'))
-
-        if green_veg == 'Per Day':
-            green_veg_day = st.selectbox('Day',('How many times do you eat Green Vegetables per day?',0,1,2,3,4,5),label_visibility="collapsed")
-
-            if green_veg_day != 'How many times do you eat Green Vegetables per day?':
-                Green_Vegetables_Consumption = green_veg_day*30
-        
-        elif green_veg == 'Per Week':
-            green_veg_week = st.selectbox('Day',('How many times do you eat Green Vegetables per week?',0,1,2,3,4,5),label_visibility="collapsed")
-            if green_veg_week != 'How many times do you eat Green Vegetables per week?':
-                Green_Vegetables_Consumption = green_veg_week *4
-        elif green_veg == 'Per Month':
-            green_veg_month = st.selectbox('Day',('How many times do you eat Green Vegetables per month?',0,1,2,3,4,5),label_visibility="collapsed")
-            if green_veg_month != 'How many times do you eat Green Vegetables per month?':
-                Green_Vegetables_Consumption = green_veg_month
-
-        fried = st.selectbox('How often do you eat any kind of fried potatoes, including French fries, home fries, or hash browns?',('Select One','Per Day',
-                                                                                'Per Week',
-                                                                                'Per Month'))
-
-        if fried == 'Per Day':
-            fried_day = st.selectbox('Day',('How many times do you eat Fried Potatoes per day?',0,1,2,3,4,5),label_visibility="collapsed")
-
-            if fried_day != 'How many times do you eat Fried Potatoes per day?':
-                FriedPotato_Consumption = fried_day*30
+            Alcohol_Consumption = st.slider(
+                                    'During the past 30 days, how many days \
+                                    did you have at least one drink of any alcoholic beverage such \
+                                    as beer, wine, a malt beverage or liquor?',
+                                    0, 30,step=1)
         
-        elif fried == 'Per Week':
-            fried_week = st.selectbox('Day',('How many times do you eat Fried Potatoes per week?',0,1,2,3,4,5),label_visibility="collapsed")
-            if fried_week != 'How many times do you eat Fried Potatoes week?':
-                FriedPotato_Consumption = fried_week *4
-        elif fried == 'Per Month':
-            fried_month = st.selectbox('Day',('How many times do you eat Fried Potatoes per month?',0,1,2,3,4,5),label_visibility="collapsed")
-            if fried_month != 'How many times do you eat Fried Potatoes per month?':
-                FriedPotato_Consumption = fried_month
+            st.write('Think about the food you ate during the past 30 days, including meals and snacks.')
+
+            #How often and how many times; features.prepare converts the count to times per month
+            frequencies = {}
+            for food, item, question in (('Fruit','fruit','Not including juices, how often do you eat a fruit?'),
+                                         ('Green_Vegetables','Green Vegetables','How often do you eat a green leafy or lettuce salad, with or without other vegetables?'),
+                                         ('FriedPotato','Fried Potatoes','How often do you eat any kind of fried potatoes, including French fries, home fries, or hash browns?')):
+                col1,col2=st.columns(2)
+                frequencies[f'{food}_Per'] = col1.selectbox(question,('Select One','Per Day','Per Week','Per Month'))
+                frequencies[f'{food}_Count'] = col2.selectbox(f'{item} count',(f'How many times do you eat {item}?',0,1,2,3,4,5),
+                                                              label_visibility="hidden")
         
-        col1, col2, col3 , col4, col5 = st.columns(5)
-        with col1:
-            pass
-        with col2:
-            pass
-        with col4:
-            pass
-        with col5:
-            pass
-        with col3 :
-            submit = st.button('Predict',type="primary")
+            col1, col2, col3 , col4, col5 = st.columns(5)
+            with col3 :
+                submit = st.form_submit_button('Predict',type="primary")
         
         st.warning('Disclaimer: **Your data is being collected to enhance our model. We prioritize your privacy and employ strict security measures.The results from this test are not intended to diagnose or treat any disease.**')
     
     
 
     with results:
-        if "load_state" not in st.session_state:
-            st.session_state.load_state=False
-        
-        if submit or st.session_state.load_state:
-            st.session_state.load_state=True
+        if submit:
             try:
-                bmi = round(Weight_kg / (Height_cm/100)**2,2)
-                new_input = [General_Health,Checkup,Exercise,Skin_Cancer,
-                            Other_Cancer,Depression,Diabetes,Arthritis,
-                            Sex,Age_Category,Height_cm,Weight_kg,bmi,
-                            Smoking_History,Alcohol_Consumption,Fruit_Consumption,
-                            Green_Vegetables_Consumption,FriedPotato_Consumption
-                ]
-                df = pd.DataFrame([new_input])
-                df.columns = ['General_Health',
-                'Checkup',
-                'Exercise',
-                'Skin_Cancer',
-                'Other_Cancer',
-                'Depression',
-                'Diabetes',
-                'Arthritis',
-                'Sex',
-                'Age_Category',
-                'Height_(cm)',
-                'Weight_(kg)',
-                'BMI',
-                'Smoking_History',
-                'Alcohol_Consumption',
-                'Fruit_Consumption',
-                'Green_Vegetables_Consumption',
-                'FriedPotato_Consumption']
-                copy_df=df.copy()
-                copy_df.insert(0, 'Name', [name])
-                test_dict={'General_Health': ['Poor', 'Very Good', 'Good', 'Fair', 'Excellent'], 'Checkup': ['Within the past 2 years', 'Within the past year', '5 or more years ago', 'Within the past 5 years', 'Never'], 'Exercise': ['No', 'Yes'], 'Skin_Cancer': ['No', 'Yes'], 'Other_Cancer': ['No', 'Yes'], 'Depression': ['No', 'Yes'], 'Diabetes': ['No', 'Yes', 'No, pre-diabetes or borderline diabetes', 'Yes, but female told only during pregnancy'], 'Arthritis': ['Yes', 'No'], 'Sex': ['Female', 'Male'], 'Age_Category': ['70-74', '60-64', '75-79', '80+', '65-69', '50-54', '45-49', '18-24', '30-34', '55-59', '35-39', '40-44', '25-29'], 'Smoking_History': ['Yes', 'No']}
-                categorical = df.select_dtypes(include=['object']).columns
-                l=[]
-                for i in test_dict.values():
-                    l.append(i)
-
-                ordinal_encoder = OrdinalEncoder(categories=l)
-                df[categorical]=ordinal_encoder.fit_transform(df[categorical])
-                pred = final_model.predict(df)
-                st.subheader("Result")
-                st.write(f'Hello, {name}!')
-                st.write('Based from the Machine Learning model, your risk of developing Cardiovascular Disease (CVD) is:')
-
-                if pred[0] == 0: 
-                    #st.balloons()    
-                    risk = 'LOW'
-                    copy_df['Heart_Disease']="No"
-                    st.success(f'**{risk}**')
-                else:
-                    risk = 'HIGH'
-                    copy_df['Heart_Disease']="Yes"
-                    st.error(f'**{risk}**')
-                
-                updated_df=pd.concat([existing_data,copy_df],ignore_index=True)
-                conn.update(worksheet="Record",data=updated_df)
-
-                cnum=['Alcohol_Consumption','Fruit_Consumption','Green_Vegetables_Consumption','FriedPotato_Consumption']
-                mean_values =odf[cnum].mean()
-                with st.expander("**Detailed information**"):
-                    for col in cnum:
-                        mean_value = mean_values[col]
-                        input_value = df.loc[0, col]
-                        col = col.replace('_', ' ')
-                        percentage_difference = abs(((input_value - mean_value) / mean_value) * 100)
-                        if input_value > mean_value:
-                            st.write(f"Your {col} ({input_value}) is greater than the mean ({mean_value:.2f}) by {percentage_difference:.2f}%")
-                        elif input_value < mean_value:
-                            st.write(f"Your {col} ({input_value}) is less than the mean ({mean_value:.2f}) by {percentage_difference:.2f}%")
+                height = {'Height_Feet': Feet, 'Height_Inches': Inches, 'Height_(cm)': Height_cm}
+                with timer.stage("input validation"):
+                    row = prepare({'General_Health': General_Health, 'Checkup': Checkup, 'Exercise': Exercise,
+                                   'Skin_Cancer': Skin_Cancer, 'Other_Cancer': Other_Cancer,
+                                   'Depression': Depression, 'Diabetes': Diabetes, 'Arthritis': Arthritis,
+                                   'Sex': Sex, 'Age_Category': Age_Category, **height, 'Weight_(kg)': Weight_kg,
+                                   'Smoking_History': Smoking_History, 'Alcohol_Consumption': Alcohol_Consumption,
+                                   **frequencies})
+                inputs = {'Name': name, **row}
+                previous = st.session_state.get("prediction")
+                #Only a changed submission reruns the pipeline; the same answers keep their result and record
+                if previous is None or previous['inputs'] != inputs:
+                    service_url = os.environ.get("SILENT_HEART_SERVICE_URL")
+                    with timer.stage("model"):
+                        feature_encoder = encoder()
+                        if not service_url:
+                            scorer = risk_scorer()
+                    with timer.stage("encoding"):
+                        X = feature_encoder.encode(row)
+                    with timer.stage("prediction"):
+                        if service_url:
+                            from service import score_remote
+                            result = score_remote(service_url, [row], explain=True)
                         else:
-                            st.write(f"Your {col} ({input_value}) is equal to the mean ({mean_value:.2f})")
-
-                with st.expander("**Recommendation**"):
-                    if pred[0]==0:
-                        st.markdown("<ul style='list-style-type:disc;'><li>Maintain a heart-healthy diet rich in fruits(pomegranate,avacado,berries), vegetables(tomatoes,onions,dioscorea), whole grains, and lean proteins.</li><li>Engage in regular physical activity such as meditation/yoga or exercise for at least 30 minutes most days of the week.</li><li>Keep up-to-date with current health guidelines to ensure ongoing adherence to heart-healthy habits.</li><li>Regular check-ups can help monitor overall health and detect any potential issues early on.</li></ul>",unsafe_allow_html=True)
-                    else:
-                        st.markdown("<ul style='list-style-type:disc;'><li>Adhere to prescribed medications and regular medical check-ups.</li><li>Seek professional guidance and support from healthcare providers or nutritionists for personalized preventive strategies.</li><li>⁠Incorporate stress-reducing activities such as meditation into daily routine and ensure adequate sleep duration</li><li>Avoid smoking and alcohol consumption with immediate effect</li><li>⁠Adopt dietary modifications to reduce salt and sugar intake.</li></ul>",unsafe_allow_html=True)
-                
-
-                #CSV download        
-                @st.cache_data
-                def convert_df(df):
-                    return df.to_csv(index=False).encode("utf-8")
-
-                csv = convert_df(copy_df)
-                current_date = datetime.now().strftime("%d-%b-%y")
-                #current_date = datetime.now()
-               
-                #PDF download
-                content_str = f"""
-                            Name:{name}\n
-                            Sex:{Sex}\n
-                            Age Category:{Age_Category}\n
-                            Height(cm):{Height_cm}\n
-                            Weight(kg):{Weight_kg}\n
-                            BMI:{bmi}\n
-                            General Health:{General_Health}\n
-                            Checkup:{Checkup}\n
-                            Smoking history:{Smoking_History}\n
-                            Skin Cancer:{Skin_Cancer}\n
-                            Other Cancer:{Other_Cancer}\n
-                            Depression:{Depression}\n
-                            Diabetes:{Diabetes}\n
-                            Arthritis:{Arthritis}\n
-                            Data in the past one month(30 days):\n
-                            Exercise:{Exercise}\n
-                            Alcohol Consumption:{Alcohol_Consumption}\n
-                            Fruit Consumption:{Fruit_Consumption}\n
-                            Green Vegetables Consumption:{Green_Vegetables_Consumption}\n
-                            Fried Potato Consumption:{FriedPotato_Consumption}\n\n
-                            The risk of developing Cardiovascular Disease (CVD) is:{risk}
-                            """
-
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial",size=18,style="B")
-                pdf.cell(0, 10, txt="Health Record", ln=1,align="C")
-                pdf.set_font("Arial", size=15)
-                pdf.multi_cell(0, 5, txt=content_str,align="L")
-                pdf_file = pdf.output(dest="S").encode("latin-1")
-                
-                st.subheader("User Record")
-                st.download_button(
-                        label="Download PDF",
-                        data=pdf_file,
-                        file_name=f"{name} details:{current_date}.pdf",
-                        mime="application/pdf",
-                        type="primary"
+                            result = scorer.score(X, explain=True)
+                    risk = 'LOW' if result['label'][0] == 0 else 'HIGH'
+                    submission_id = uuid4().hex
+                    with timer.stage("cohort"):
+                        peers = cohort_index("CVD_cleaned.csv", data_version("CVD_cleaned.csv")).compare(row, Sex, Age_Category)
+                    #Only small, plain values are kept per session; report bytes live in the shared renderer cache
+                    st.session_state.prediction = {'inputs': inputs, 'risk': risk, 'score': float(result['risk'][0]),
+                                                   'contributions': result['contributions'].iloc[0].drop('Bias').to_dict(),
+                                                   'peers': peers, 'submission_id': submission_id,
+                                                   'encoded': X[0].tolist()}
+                    #Recorded only once the result is stored and will be shown
+                    with timer.stage("record"):
+                        record_queue().put("Record",{**inputs,'Heart_Disease': "No" if risk == 'LOW' else "Yes",
+                                                     'Submission ID': submission_id},
+                                           key=f"{submission_id}:Record")
+            except ValueError as exc:
+                #features.SchemaError names the unanswered or invalid questions
+                metrics.error("prediction input", exc)
+                st.session_state.pop("prediction", None)
+                st.error(f"Please enter valid values. {exc}")
+            except Exception as exc:
+                metrics.error("prediction", exc)
+                st.session_state.pop("prediction", None)
+                logging.getLogger("silent_heart").exception("Prediction failed")
+                st.error("Something went wrong while computing your result. Please try again.")
+
+        prediction = st.session_state.get("prediction")
+        if prediction is not None:
+            inputs, risk = prediction['inputs'], prediction['risk']
+            name = inputs['Name']
+            st.subheader("Result")
+            st.write(f'Hello, {name}!')
+            st.write('Based from the Machine Learning model, your risk of developing Cardiovascular Disease (CVD) is:')
+
+            if risk == 'LOW': 
+                #st.balloons()    
+                st.success(f'**{risk}**')
+            else:
+                st.error(f'**{risk}**')
+
+            with st.expander("**Detailed information**"):
+                st.caption(f"Compared with people in our dataset of the same sex ({inputs['Sex']}) and age ({inputs['Age_Category']}).")
+                for col, stats in prediction['peers'].items():
+                    label = ' '.join(col.replace('_', ' ').split())
+                    line = (f"Your {label} ({stats['value']:g}) is at the **{ordinal(stats['percentile'])} percentile** "
+                            f"of your peers (median {stats['median']:.2f}, mean {stats['mean']:.2f})")
+                    if 'percentile_no' in stats and 'percentile_yes' in stats:
+                        line += (f"; the {ordinal(stats['percentile_no'])} among peers without heart disease "
+                                 f"and the {ordinal(stats['percentile_yes'])} among peers with heart disease")
+                    st.write(line + ".")
+
+            with st.expander("**Explanation**"):
+                st.write(f"Estimated risk score: **{prediction['score']:.1%}**")
+                contributions = pd.Series(prediction['contributions'])
+                contributions = contributions.reindex(contributions.abs().sort_values(ascending=False).index)
+                contributions.index = contributions.index.str.replace('_', ' ')
+                st.caption("How much each answer pushed the model's score up (towards HIGH) or down (towards LOW).")
+                st.bar_chart(contributions.head(10).rename("Contribution"))
+
+            with st.expander("**What if?**"):
+                st.caption("Change these answers to see how the model's risk score would respond. "
+                           "This is a simulation, not medical advice.")
+                what_if(prediction)
+
+            with st.expander("**Recommendation**"):
+                if risk == 'LOW':
+                    st.markdown("<ul style='list-style-type:disc;'><li>Maintain a heart-healthy diet rich in fruits(pomegranate,avacado,berries), vegetables(tomatoes,onions,dioscorea), whole grains, and lean proteins.</li><li>Engage in regular physical activity such as meditation/yoga or exercise for at least 30 minutes most days of the week.</li><li>Keep up-to-date with current health guidelines to ensure ongoing adherence to heart-healthy habits.</li><li>Regular check-ups can help monitor overall health and detect any potential issues early on.</li></ul>",unsafe_allow_html=True)
+                else:
+                    st.markdown("<ul style='list-style-type:disc;'><li>Adhere to prescribed medications and regular medical check-ups.</li><li>Seek professional guidance and support from healthcare providers or nutritionists for personalized preventive strategies.</li><li>⁠Incorporate stress-reducing activities such as meditation into daily routine and ensure adequate sleep duration</li><li>Avoid smoking and alcohol consumption with immediate effect</li><li>⁠Adopt dietary modifications to reduce salt and sugar intake.</li></ul>",unsafe_allow_html=True)
+
+            #CSV and PDF download, rendered once per distinct record
+            with timer.stage("report"):
+                renderer = report_renderer()
+                csv = renderer.csv({**inputs, 'Heart_Disease': "No" if risk == 'LOW' else "Yes"})
+                pdf_file = renderer.pdf({**inputs, 'Risk': risk})
+            current_date = datetime.now().strftime("%d-%b-%y")
+            
+            st.subheader("User Record")
+            st.download_button(
+                    label="Download PDF",
+                    data=pdf_file,
+                    file_name=f"{name} details:{current_date}.pdf",
+                    mime="application/pdf",
+                    type="primary"
+                )
+            st.download_button(
+                    label="Download CSV",
+                    data=csv,
+                    file_name=f"{name} details:{current_date}.csv",
+                    mime="text/csv",
+                    type="primary"
                     )
-                st.download_button(
-                        label="Download CSV",
-                        data=csv,
-                        file_name=f"{name} details:{current_date}.csv",
-                        mime="text/csv",
-                        type="primary"
-                        )
-                
-
-                with st.expander("**Doctor's Validation (To be filled by a medical practitioner only)**"):
-                    doctorname=st.text_input("Enter Doctor's Name")
-                    doctoropinion = st.radio('What is the risk of patient developing Cardiovascular Disease (CVD)?',
-                                    ('LOW','HIGH'),horizontal=True,index=None)
-                    if doctoropinion!=None and doctorname!=None:
-                        if risk==doctoropinion:
-                            validation="Correct"
-                        else:
-                            validation="Wrong"
-
-                        validationdata = {'Patient Name': [name],
-                                'Model output': [risk],
-                                'Doctor output': [doctoropinion],
-                                'Validation':[validation],
-                                'Doctor Name':[doctorname]
-                                }
-                        validationdf=pd.DataFrame(validationdata)
-                        updated_validation_df=pd.concat([existing_data_validation,validationdf],ignore_index=True)
-                        conn.update(worksheet="Validation",data=updated_validation_df)
-                        st.success(f"Thank you Dr.{doctorname} for validating our model!")      
-                         
-            except:
-                st.error("Please enter valid values")
+
+            with st.expander("**Doctor's Validation (To be filled by a medical practitioner only)**"):
+                doctor_validation(prediction)
 
 
 #Find a doctor page
 if selected=="Find a Doctor":
+    with timer.stage("imports"):
+        from doctors import doctor_map
     st.title(":red[Find a Doctor]")
-    mapdata=pd.read_excel("Cardiologist_List.xlsx")
-    state=st.selectbox("Choose your State",mapdata['State'].unique(),index=None,placeholder="State")
+    with timer.stage("directory"):
+        directory=doctor_directory("Cardiologist_List.xlsx")
+    state=st.selectbox("Choose your State",directory.states,index=None,placeholder="State")
     if state!=None:
-        mapdata['Check']=False
-        filtered_df = mapdata[mapdata['State'] == state]
+        filtered_df = directory.in_state(state)
+        filtered_df['Check']=False
         t=st.data_editor(filtered_df,column_order=['Check','Doctor Name','Address','Phone','Email','URL','City']
         ,column_config={"URL":st.column_config.LinkColumn(),
         "Check":st.column_config.CheckboxColumn(width='small',help="Select the checkbox to see the location on map")},
         hide_index=True,disabled=['Doctor Name','Address','Phone','Email','URL','City'])
         check=t[t['Check']==True]
         contains_true = check['Check'].any()
-        if contains_true:
-            fig =scatter_mapbox(check, lat="lat", lon="lng", hover_name="City", hover_data=["Address"],
-                                    color_discrete_sequence=["red"], zoom=12)
-            fig.update_layout(mapbox_style="open-street-map")
-            fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-        else:
-            fig =scatter_mapbox(t, lat="lat", lon="lng", hover_name="City", hover_data=["Address"],
-                                    color_discrete_sequence=["red"], zoom=6)
-            fig.update_layout(mapbox_style="open-street-map")
-            fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
+        with timer.stage("map"):
+            if contains_true:
+                fig = doctor_map(check, zoom=12)
+            else:
+                fig = doctor_map(t, zoom=6)
         st.plotly_chart(fig,use_column_width=True)
         with st.expander("**Doctors across India**"):
-            st.cache_data(show_spinner="Loading map...")
-            def loadmap():
-                fig2 =scatter_mapbox(mapdata, lat="lat", lon="lng", hover_name="City", hover_data=["State","Address"],
-                                        color_discrete_sequence=["red"], zoom=4)
-                fig2.update_layout(mapbox_style="open-street-map")
-                fig2.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-                st.plotly_chart(fig2,use_column_width=True)
-
-            loadmap()
+            st.plotly_chart(india_map("Cardiologist_List.xlsx"),use_column_width=True)
+    with st.expander("**Nearest cardiologists**"):
+        col1,col2,col3=st.columns(3)
+        lat=col1.number_input("Latitude",min_value=-90.0,max_value=90.0,value=19.076,format="%.4f")
+        lng=col2.number_input("Longitude",min_value=-180.0,max_value=180.0,value=72.8777,format="%.4f")
+        k=col3.number_input("Number of doctors",min_value=1,max_value=20,value=5)
+        nearest=directory.nearest(lat,lng,k=k)
+        st.dataframe(nearest,column_order=['Doctor Name','Distance (km)','Address','Phone','City','State'],
+                     column_config={"Distance (km)":st.column_config.NumberColumn(format="%.1f")},hide_index=True)
 
 #About page
 if selected=="About":
     st.title(":red[Information]")
     st.markdown("<div style='text-align: justify; padding:30px;'><p>The term <span style='color:#ff4b4b;'>heart disease</span> refers to a broad range of disorders that impair arteries, blood vessels, and other organs and cause abnormal heart function. In the modern world, heart disease is the primary cause of death. The World Health Organization estimates that cardiac conditions will kill 12 million people globally year. Irrespective of the type of heart disease afflicting an individual, the benefit of early detection is undeniable. Similar to other medical conditions, early detection of heart disease simplifies treatment and significantly raises a patient's chances of survival.</p><p>The purpose of this Heart Disease Prediction App is to assist users in evaluating their cardiovascular health.It is crucial to examine the interdependence of the risk factors in patients' medical histories and comprehend their respective contributions to the prognosis of heart disease. This algorithm predicts whether or not a user has heart disease based on a variety of characteristics, including age, gender, the user's history of depression or diabetes, and numerous other lifestyle factors like alcohol usage or smoking.In addition, this program allows users to evaluate their cardiovascular health and provides contact information for many physicians.</p></div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align: center; margin-top: 25px;'><p style='color:#ff4b4b;font-weight: bold;'>Contact us</p><a href='mailto:silentheart.care@gmail.com'> silentheart.care@gmail.com</a></div>", unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown("<div style='text-align: center; margin-top: 25px;'><p style='color:#ff4b4b;font-weight: bold;'>Contact us</p><a href='mailto:silentheart.care@gmail.com'> silentheart.care@gmail.com</a></div>", unsafe_allow_html=True)
+
+#Timing report
+timings = timer.finish(selected)
+if report_enabled():
+    with st.sidebar.expander("Timings"):
+        st.caption("Startup" if timer.cold else f"Rerun #{timer.run}")
+        st.table(timings)
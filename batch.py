@@ -0,0 +1,131 @@
+"""Headless batch scoring for whole CVD cohorts.
+
+Reads a CSV or Parquet file with the same feature columns as CVD_cleaned.csv
+(or the raw inputs ``features.prepare`` derives them from, e.g. heights in
+feet and inches or food counts per day/week/month), scores it in chunks and
+writes the predicted label and risk score per row:
+
+    python batch.py cohort.csv -o scored.csv --chunk-size 50000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+from encoding import FeatureEncoder
+from features import prepare
+from scoring import RiskScorer
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most ``chunk_size`` rows from a CSV or Parquet file."""
+    path = Path(path)
+    if path.suffix in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._parquet = self.path.suffix in PARQUET_SUFFIXES
+        self._writer = None
+        self._header = True
+
+    def write(self, frame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class BatchScorer:
+    """Loads the model once and scores DataFrames of raw features."""
+
+    def __init__(self, model_path='model.joblib', model=None, encoder=None, explain=False):
+        self.model = model if model is not None else load(model_path)
+        self.encoder = encoder or FeatureEncoder()
+        self.scorer = RiskScorer(self.model, self.encoder)
+        self.explain = explain
+
+    def predict_proba(self, frame):
+        return self.scorer.predict_proba(self.encoder.transform(prepare(frame)))
+
+    def score(self, frame):
+        """Return ``frame`` with ``Predicted_Heart_Disease`` and ``Risk_Score`` columns.
+
+        With ``explain`` the per-feature contributions are added as ``Contribution_*`` columns.
+        """
+        features = prepare(frame)
+        result = self.scorer.score(self.encoder.transform(features), explain=self.explain)
+        scored = frame.copy()
+        scored[features.columns] = features
+        scored['Predicted_Heart_Disease'] = np.where(result['label'] == 1, 'Yes', 'No')
+        scored['Risk_Score'] = result['risk']
+        if self.explain:
+            contributions = result['contributions'].add_prefix('Contribution_')
+            contributions.index = scored.index
+            scored = pd.concat([scored, contributions], axis=1)
+        return scored
+
+    def score_file(self, path, output=None, chunk_size=50_000):
+        """Score ``path`` chunk by chunk, optionally writing to ``output``."""
+        writer = ChunkWriter(output) if output else None
+        rows = 0
+        start = time.perf_counter()
+        try:
+            for chunk in read_chunks(path, chunk_size):
+                scored = self.score(chunk)
+                rows += len(scored)
+                if writer is not None:
+                    writer.write(scored)
+        finally:
+            if writer is not None:
+                writer.close()
+        seconds = time.perf_counter() - start
+        return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CVD cohort file with the Silent Heart model.")
+    parser.add_argument('input', help="CSV or Parquet file with the CVD_cleaned.csv feature columns")
+    parser.add_argument('-o', '--output', help="CSV or Parquet file to write the scored rows to")
+    parser.add_argument('-m', '--model', default='model.joblib', help="model artifact to load")
+    parser.add_argument('--chunk-size', type=int, default=50_000, help="rows scored per predict call")
+    parser.add_argument('--explain', action='store_true', help="add per-feature TreeSHAP contributions")
+    args = parser.parse_args(argv)
+
+    load_start = time.perf_counter()
+    scorer = BatchScorer(args.model, explain=args.explain)
+    load_seconds = time.perf_counter() - load_start
+    stats = scorer.score_file(args.input, args.output, args.chunk_size)
+    print(f"Loaded model in {load_seconds:.3f}s; scored {stats['rows']} rows in {stats['seconds']:.3f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
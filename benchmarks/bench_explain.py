@@ -0,0 +1,44 @@
+"""Check that TreeSHAP explanations stay within a per-row latency budget.
+
+    python benchmarks/bench_explain.py --budget-ms 0.5
+
+Exits with status 1 when the explanation overhead per row exceeds the budget
+at any batch size of 100 rows or more (single rows are reported only).
+"""
+import argparse
+import sys
+
+from common import MODEL, measure, sample_frame
+
+from joblib import load
+
+from scoring import RiskScorer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=0.5, help="allowed explanation cost per row (ms)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    scorer = RiskScorer(load(MODEL))
+    ok = True
+    print(f"{'rows':>8} {'score ms/row':>14} {'explain ms/row':>16} {'overhead ms/row':>17}")
+    for size in args.sizes:
+        X = scorer.encoder.transform(sample_frame(size))
+        repeat = max(5, min(200, 20000 // size))
+        plain = measure(lambda: scorer.score(X), repeat=repeat)
+        explained = measure(lambda: scorer.score(X, explain=True), repeat=repeat)
+        per_row = plain['p50'] * 1000 / size
+        explain_per_row = explained['p50'] * 1000 / size
+        overhead = explain_per_row - per_row
+        flag = ""
+        if size >= 100 and overhead > args.budget_ms:
+            ok = False
+            flag = "  over budget"
+        print(f"{size:>8} {per_row:>14.4f} {explain_per_row:>16.4f} {overhead:>17.4f}{flag}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
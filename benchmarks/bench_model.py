@@ -0,0 +1,110 @@
+"""Compare the joblib model with the exported fast-path artifacts.
+
+    python export.py model.joblib --out-dir artifacts
+    python benchmarks/bench_model.py --artifacts artifacts
+
+Reports load time and resident memory (each load runs in a fresh
+interpreter) and per-row / per-batch latency for the sklearn predict path,
+the native booster, and the pure-NumPy tree evaluator.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import MODEL, ROOT, measure, sample_frame
+
+LOADERS = {
+    'joblib': "from joblib import load; obj = load({path!r})",
+    'booster': "import xgboost as xgb; obj = xgb.Booster(model_file={path!r})",
+    'trees': "from treeeval import TreeEnsemble; obj = TreeEnsemble.load({path!r})",
+}
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def load_probe(kind, path):
+    """Run in a child interpreter: time the import plus load of one artifact and its memory cost."""
+    before = rss_kb()
+    start = time.perf_counter()
+    exec(LOADERS[kind].format(path=str(path)), {})
+    seconds = time.perf_counter() - start
+    after = rss_kb()
+    print(json.dumps({'seconds': seconds, 'rss_kb': None if before is None else after - before}))
+
+
+def measure_load(kind, path):
+    out = subprocess.run([sys.executable, __file__, '--probe', kind, str(path)], capture_output=True,
+                         text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark joblib vs exported model artifacts.")
+    parser.add_argument('--artifacts', default=str(ROOT / "artifacts"))
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--probe', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args(argv)
+    if args.probe:
+        load_probe(*args.probe)
+        return 0
+
+    import numpy as np
+    import xgboost as xgb
+    from joblib import load
+
+    from encoding import FeatureEncoder
+    from export import export
+    from treeeval import TreeEnsemble
+
+    artifacts = {'joblib': MODEL, 'booster': ROOT / args.artifacts / "model.ubj",
+                 'trees': ROOT / args.artifacts / "trees.npz"}
+    model = load(MODEL)
+    if not artifacts['booster'].exists() or not artifacts['trees'].exists():
+        export(model, ROOT / args.artifacts)
+
+    results = {'load': {kind: measure_load(kind, path) for kind, path in artifacts.items()}}
+    encoder = FeatureEncoder()
+    booster = xgb.Booster(model_file=str(artifacts['booster']))
+    trees = TreeEnsemble.load(artifacts['trees'])
+    paths = {
+        'joblib': lambda X: model.predict(encoder.frame(X)),
+        'booster': lambda X: booster.inplace_predict(X, validate_features=False) > 0.5,
+        'trees': trees.predict,
+    }
+    results['latency'] = {}
+    frame = sample_frame(args.batch)
+    X_batch = encoder.transform(frame)
+    X_row = X_batch[:1]
+    reference = model.predict(encoder.frame(X_batch))
+    for kind, predict in paths.items():
+        if not np.array_equal(np.asarray(predict(X_batch), dtype=int), reference):
+            raise AssertionError(f"{kind} predictions differ from the joblib model")
+        results['latency'][kind] = {'row': measure(lambda: predict(X_row), repeat=500),
+                                    'batch': measure(lambda: predict(X_batch), repeat=20)}
+
+    print(f"{'path':>8} {'load ms':>9} {'load RSS KB':>12} {'row p50 us':>11} {'row p99 us':>11} "
+          f"{'batch ms':>9} {'rows/s':>12}")
+    for kind in artifacts:
+        load_stats, latency = results['load'][kind], results['latency'][kind]
+        rss = load_stats['rss_kb'] if load_stats['rss_kb'] is not None else float('nan')
+        print(f"{kind:>8} {load_stats['seconds'] * 1000:>9.1f} {rss:>12.0f} "
+              f"{latency['row']['p50'] * 1e6:>11.1f} {latency['row']['p99'] * 1e6:>11.1f} "
+              f"{latency['batch']['p50'] * 1000:>9.2f} {args.batch / latency['batch']['p50']:>12,.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the repository root, e.g. ``python benchmarks/bench_explain.py``.
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from encoding import CATEGORIES, FEATURES  # noqa: E402
+
+DATASET = ROOT / "CVD_cleaned.csv"
+MODEL = ROOT / "model.joblib"
+
+
+def sample_frame(n, seed=0):
+    """``n`` feature rows, drawn from CVD_cleaned.csv when present, else synthesized."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    if DATASET.exists():
+        df = pd.read_csv(DATASET, usecols=FEATURES)
+        return df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    height = rng.normal(170, 10, n).round(0)
+    weight = rng.normal(80, 15, n).round(2)
+    frame = {col: rng.choice(values, n) for col, values in CATEGORIES.items()}
+    frame.update({'Height_(cm)': height, 'Weight_(kg)': weight, 'BMI': (weight / (height / 100) ** 2).round(2),
+                  'Alcohol_Consumption': rng.integers(0, 31, n).astype(float),
+                  'Fruit_Consumption': rng.integers(0, 121, n).astype(float),
+                  'Green_Vegetables_Consumption': rng.integers(0, 121, n).astype(float),
+                  'FriedPotato_Consumption': rng.integers(0, 61, n).astype(float)})
+    return pd.DataFrame(frame)[FEATURES]
+
+
+def measure(fn, repeat=50, warmup=3):
+    """Run ``fn`` repeatedly and return latency statistics in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples)
+    return {'mean': float(samples.mean()), 'p50': float(np.percentile(samples, 50)),
+            'p95': float(np.percentile(samples, 95)), 'p99': float(np.percentile(samples, 99)),
+            'n': len(samples)}
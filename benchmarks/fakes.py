@@ -0,0 +1,82 @@
+"""Offline stand-ins for external services used by the app."""
+import re
+import time
+
+import pandas as pd
+
+
+class FakeWorksheet:
+    """In-memory gspread worksheet: a header row followed by data rows, as lists of cells."""
+
+    def __init__(self, connection, rows=None):
+        self.connection = connection
+        self.rows = rows or []
+        self.appends = 0
+
+    def row_values(self, row):
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self.connection._wait(len(self.rows))
+        return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def update(self, range_name="A1", values=None, **kwargs):
+        if range_name != "A1":
+            raise NotImplementedError("the fake only supports writing the header row")
+        if self.rows:
+            self.rows[0] = list(values[0])
+        else:
+            self.rows.append(list(values[0]))
+
+    def append_rows(self, values, **kwargs):
+        self.appends += 1
+        self.connection._wait(len(values))
+        self.rows.extend(list(row) for row in values)
+
+    def get(self, range_name, **kwargs):
+        start = int(re.match(r"[A-Z]+(\d+)", range_name).group(1))
+        rows = self.rows[start - 1:]
+        self.connection._wait(len(rows))
+        return [list(row) for row in rows]
+
+
+class FakeGSheetsConnection:
+    """In-memory replacement for the ``streamlit_gsheets`` connection.
+
+    Supports the ``read`` call and the gspread worksheet operations
+    ``storage.GSheetsStore`` makes, with an optional fixed round-trip latency
+    and a per-row transfer cost so reading a growing sheet costs what it would
+    against the real API.
+    """
+
+    def __init__(self, latency=0.0, per_row=0.0):
+        self.latency = latency
+        self.per_row = per_row
+        self.worksheets = {}
+        self.reads = 0
+
+    def _wait(self, rows):
+        delay = self.latency + self.per_row * rows
+        if delay:
+            time.sleep(delay)
+
+    @property
+    def client(self):
+        return self
+
+    def _select_worksheet(self, worksheet):
+        return self.worksheets.setdefault(worksheet, FakeWorksheet(self))
+
+    def load(self, worksheet, frame):
+        """Replace a worksheet's contents with ``frame`` (header plus rows)."""
+        rows = [list(frame.columns), *frame.astype(object).where(frame.notna(), "").to_numpy().tolist()]
+        self.worksheets[worksheet] = FakeWorksheet(self, rows)
+
+    def read(self, worksheet, usecols=None, ttl=None, **kwargs):
+        self.reads += 1
+        rows = self._select_worksheet(worksheet).rows
+        self._wait(len(rows))
+        frame = pd.DataFrame(rows[1:], columns=rows[0]) if rows else pd.DataFrame()
+        if usecols is not None:
+            frame = frame.iloc[:, [i for i in usecols if i < frame.shape[1]]]
+        return frame
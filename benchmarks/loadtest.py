@@ -0,0 +1,166 @@
+"""Headless multi-session load driver built on Streamlit's AppTest.
+
+    python benchmarks/loadtest.py --sessions 40 --concurrency 8 -o load.json
+
+Each simulated session opens a page, and for the Prediction page fills in
+the form and submits it, then submits a doctor's validation. Every script run
+is timed, and p50/p95/p99 latency and throughput are reported per step and
+overall. Records go to a temporary SQLite store, so no Google Sheets access is
+needed.
+
+AppTest is not thread-safe, so concurrent sessions run in ``--concurrency``
+worker processes, each warmed up with one session per page. Like separate app
+workers, each process has its own Streamlit caches.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from common import ROOT
+
+PAGES = ["Home", "Prediction", "Find a Doctor", "About"]
+
+FORM = {
+    'selectbox': {'In what Age category': '45-49', 'Sex': 'Male', 'Feet': 5, 'Inches': 9,
+                  'Would you say that in general': 'Good', 'About how long has it been': 'Within the past year',
+                  'Not including juices': 'Per Week',
+                  'How often do you eat a green leafy': 'Per Week',
+                  'How often do you eat any kind of fried potatoes': 'Per Month'},
+    'followup': {'How many times do you eat fruit': 3,
+                 'How many times do you eat Green Vegetables': 2,
+                 'How many times do you eat Fried Potatoes': 1},
+    'number_input': {'Weight (kg)': 78.0},
+}
+
+
+def _find(widgets, prefix):
+    """Widget whose label, or whose placeholder first option, starts with ``prefix``."""
+    for widget in widgets:
+        options = getattr(widget, 'options', None) or []
+        if " ".join(widget.label.split()).startswith(prefix) or (options and str(options[0]).startswith(prefix)):
+            return widget
+    raise LookupError(f"No widget labelled {prefix!r}")
+
+
+class Session:
+    def __init__(self, page, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout)
+        self.app.query_params["page"] = page
+        self.timings = []
+
+    def run(self, step):
+        start = time.perf_counter()
+        self.app.run()
+        self.timings.append((step, time.perf_counter() - start))
+        if self.app.exception:
+            raise RuntimeError(f"{step}: {self.app.exception[0].message}")
+
+
+def prediction_session(session):
+    at = session.app
+    #The answers sit in a form, so filling them in does not rerun the script until Predict
+    for prefix, value in {**FORM['selectbox'], **FORM['followup']}.items():
+        _find(at.selectbox, prefix).set_value(value)
+    for label, value in FORM['number_input'].items():
+        _find(at.number_input, label).set_value(value)
+    _find(at.button, "Predict").click()
+    session.run("predict")
+    _find(at.text_input, "Enter Doctor's Name").set_value("Load Test")
+    _find(at.radio, "What is the risk").set_value("LOW")
+    _find(at.button, "Submit validation").click()
+    session.run("validation")
+
+
+def simulate(page, timeout):
+    session = Session(page, timeout)
+    session.run("open")
+    if page == "Prediction":
+        prediction_session(session)
+    return session.timings
+
+
+def warm_up(pages, timeout, barrier):
+    """Worker initializer: one session per page so the first measured runs are not all cold starts."""
+    for page in pages:
+        simulate(page, timeout)
+    barrier.wait()
+
+
+def summarize(samples):
+    samples = np.array(samples)
+    return {'n': len(samples), 'mean': float(samples.mean()), 'p50': float(np.percentile(samples, 50)),
+            'p95': float(np.percentile(samples, 95)), 'p99': float(np.percentile(samples, 99))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent headless app sessions and report latency.")
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pages', nargs='+', default=PAGES, choices=PAGES)
+    parser.add_argument('--timeout', type=float, default=120.0, help="seconds allowed per script run")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="silent-heart-load-"))
+    os.environ.update({'SILENT_HEART_STORE': 'sqlite', 'SILENT_HEART_DB': str(tmp / "records.sqlite3"),
+                       'SILENT_HEART_SPOOL': str(tmp / "spool.sqlite3")})
+    os.chdir(ROOT)
+
+    pages = [args.pages[i % len(args.pages)] for i in range(args.sessions)]
+    errors = []
+    steps = {}
+    #Spawned workers start clean instead of inheriting this process's state
+    context = multiprocessing.get_context("spawn")
+    workers = min(args.concurrency, args.sessions)
+    #Every worker waits here after warming up, so the clock starts once all of them are ready
+    barrier = context.Barrier(workers + 1)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=warm_up,
+                               initargs=(args.pages, args.timeout, barrier))
+    with pool:
+        #Submitting starts one worker per task up to max_workers
+        futures = [(page, pool.submit(simulate, page, args.timeout)) for page in pages]
+        #Bounded so a worker that fails to warm up (a broken pool) cannot hang the driver
+        barrier.wait(timeout=args.timeout * (len(args.pages) + 1))
+        start = time.perf_counter()
+        for page, future in futures:
+            try:
+                for step, seconds in future.result():
+                    steps.setdefault(f"{page}: {step}", []).append(seconds)
+            except Exception as exc:
+                errors.append(f"{page}: {exc}")
+    wall = time.perf_counter() - start
+
+    all_runs = [seconds for samples in steps.values() for seconds in samples]
+    results = {name: summarize(samples) for name, samples in steps.items()}
+    overall = summarize(all_runs) if all_runs else {}
+    overall.update({'runs_per_second': len(all_runs) / wall, 'sessions': args.sessions,
+                    'concurrency': args.concurrency, 'errors': len(errors)})
+
+    print(f"{'step':<36} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, stats in {**results, 'overall': overall}.items():
+        if 'p50' in stats:
+            print(f"{name:<36} {stats['n']:>5} {stats['p50'] * 1000:>10.1f} {stats['p95'] * 1000:>10.1f} "
+                  f"{stats['p99'] * 1000:>10.1f}")
+    print(f"{len(all_runs)} script runs in {wall:.1f}s ({overall['runs_per_second']:.1f} runs/s), "
+          f"{len(errors)} failed sessions")
+    for error in errors[:10]:
+        print(f"  {error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'results': {'overall': overall, **results}, 'errors': errors}, f, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
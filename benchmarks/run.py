@@ -0,0 +1,279 @@
+"""Offline benchmark suite for the app's hot paths.
+
+    python benchmarks/run.py                       # run everything, print a table
+    python benchmarks/run.py -k predict pdf        # only benchmarks whose name contains a pattern
+    python benchmarks/run.py -o results.json       # also write machine-readable results
+    python benchmarks/run.py --compare base.json   # exit 1 if any p50 regressed by more than --tolerance
+
+No network access is needed: record writes go to a local SQLite store and to
+an in-memory stand-in for the Google Sheets connection. Benchmarks that need
+CVD_cleaned.csv fall back to synthetic rows when it is missing.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import DATASET, MODEL, ROOT, measure, sample_frame
+from fakes import FakeGSheetsConnection
+
+DOCTORS = ROOT / "Cardiologist_List.xlsx"
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def timed_once(fn, repeat=3):
+    """Latency statistics for expensive calls that can only run a few times."""
+    return measure(fn, repeat=repeat, warmup=0)
+
+
+class Context:
+    """Lazily loaded resources shared by the benchmarks."""
+
+    def __init__(self, batch_rows):
+        self.batch_rows = batch_rows
+        self._model = None
+        self._dataset = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from joblib import load
+            self._model = load(MODEL)
+        return self._model
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            if DATASET.exists():
+                from data import load_dataset
+                self._dataset = load_dataset(DATASET, cache_dir=tempfile.mkdtemp())
+            else:
+                frame = sample_frame(300_000)
+                frame['Heart_Disease'] = np.where(np.random.default_rng(0).random(len(frame)) < 0.08, 'Yes', 'No')
+                self._dataset = frame
+        return self._dataset
+
+
+def form_submission(row):
+    """The raw answers the Prediction form submits for a feature row (feet and inches, counts per week)."""
+    from encoding import CATEGORIES
+    from features import FOODS, INCH_CM
+
+    inches = round(row['Height_(cm)'] / INCH_CM)
+    submission = {col: row[col] for col in CATEGORIES}
+    submission.update({'Height_Feet': inches // 12, 'Height_Inches': inches % 12, 'Height_(cm)': None,
+                       'Weight_(kg)': row['Weight_(kg)'], 'Alcohol_Consumption': row['Alcohol_Consumption']})
+    for col, food in FOODS.items():
+        submission.update({f"{food}_Per": 'Per Week', f"{food}_Count": min(round(row[col] / 4), 5)})
+    return submission
+
+
+@benchmark("predict_single")
+def predict_single(ctx):
+    """One form submission as the app handles it: validate and derive the features, encode, score and explain."""
+    from encoding import FeatureEncoder
+    from features import prepare
+    from scoring import RiskScorer
+
+    scorer = RiskScorer(ctx.model, FeatureEncoder())
+    submission = form_submission(sample_frame(1).iloc[0].to_dict())
+    return {'latency': measure(lambda: scorer.score(scorer.encoder.encode(prepare(submission)), explain=True),
+                               repeat=500)}
+
+
+@benchmark("what_if")
+def what_if(ctx):
+    """Build and score one patient's counterfactual grid, then read the sensitivity curves from it."""
+    from encoding import FeatureEncoder
+    from scoring import RiskScorer
+    from whatif import sensitivity, simulate
+
+    scorer = RiskScorer(ctx.model, FeatureEncoder())
+    row = sample_frame(1).iloc[0].to_dict()
+    x = scorer.encoder.encode(row)
+    stats = measure(lambda: sensitivity(simulate(row, x, scorer), row), repeat=100)
+    stats['variants'] = len(simulate(row, x, scorer))
+    return {'latency': stats}
+
+
+@benchmark("batch_throughput")
+def batch_throughput(ctx):
+    from batch import BatchScorer
+
+    scorer = BatchScorer(model=ctx.model)
+    frame = sample_frame(ctx.batch_rows)
+    stats = measure(lambda: scorer.score(frame), repeat=5, warmup=1)
+    stats['rows_per_second'] = ctx.batch_rows / stats['p50']
+    return {'latency': stats}
+
+
+@benchmark("load_data")
+def load_data(ctx):
+    if not DATASET.exists():
+        return {}
+    from data import load_dataset
+
+    def cold():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            load_dataset(DATASET, cache_dir=cache_dir)
+
+    warm_dir = tempfile.mkdtemp()
+    load_dataset(DATASET, cache_dir=warm_dir)
+    return {'cold': timed_once(cold), 'warm': measure(lambda: load_dataset(DATASET, cache_dir=warm_dir), repeat=10)}
+
+
+@benchmark("dashboard")
+def dashboard(ctx):
+    from dashboard import bmi_box_figure, bmi_histogram_figure, smoking_figure, summarize, sunburst_figure
+
+    df = ctx.dataset
+    summary = summarize(df)
+    builders = {'viz1': smoking_figure, 'viz2': bmi_box_figure, 'viz3': sunburst_figure, 'viz4': bmi_histogram_figure}
+    results = {'summarize': timed_once(lambda: summarize(df))}
+    for name, build in builders.items():
+        results[name] = measure(lambda: build(summary).to_json(), repeat=20)
+    return results
+
+
+@benchmark("find_a_doctor")
+def find_a_doctor(ctx):
+    from doctors import DoctorDirectory, doctor_map
+
+    def cold():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            DoctorDirectory.from_file(DOCTORS, cache_dir=cache_dir)
+
+    warm_dir = tempfile.mkdtemp()
+    directory = DoctorDirectory.from_file(DOCTORS, cache_dir=warm_dir)
+    state = directory.states[0]
+    return {'load_cold': timed_once(cold),
+            'load_warm': measure(lambda: DoctorDirectory.from_file(DOCTORS, cache_dir=warm_dir), repeat=10),
+            'state_filter': measure(lambda: directory.in_state(state), repeat=200),
+            'nearest': measure(lambda: directory.nearest(19.076, 72.8777, k=5), repeat=200),
+            'india_map': measure(lambda: doctor_map(directory.table, zoom=4).to_json(), repeat=10)}
+
+
+@benchmark("pdf")
+def pdf(ctx):
+    from reports import ReportRenderer
+
+    renderer = ReportRenderer()
+    record = {**sample_frame(1).iloc[0].to_dict(), 'Name': "Benchmark", 'Risk': "LOW"}
+    counter = iter(range(10 ** 9))
+    return {'render': measure(lambda: renderer.pdf({**record, 'Name': f"Patient {next(counter)}"}), repeat=50),
+            'cached': measure(lambda: renderer.pdf(record), repeat=500)}
+
+
+@benchmark("record_append")
+def record_append(ctx):
+    """Appending one prediction row to the Record worksheet as it grows."""
+    from storage import GSheetsStore, SQLiteStore, WORKSHEETS
+
+    frame = sample_frame(1)
+    frame.insert(0, 'Name', "Benchmark")
+    frame['Heart_Disease'] = "No"
+    frame['Submission ID'] = "benchmark"
+    frame['Key'] = "existing"
+    frame = frame[WORKSHEETS["Record"]]
+    counter = iter(range(10 ** 9))
+
+    def row():
+        #A fresh idempotency key per call, as every queued row has
+        return frame.assign(Key=f"benchmark-{next(counter)}")
+
+    results = {}
+    for rows in (1_000, 10_000):
+        conn = FakeGSheetsConnection()
+        existing = frame.loc[frame.index.repeat(rows)].reset_index(drop=True)
+        conn.load("Record", existing.assign(Key=[f"existing-{i}" for i in range(rows)]))
+        store = GSheetsStore(conn)
+        results[f"gsheets_{rows}"] = measure(lambda: store.append("Record", row()), repeat=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteStore(Path(tmp) / "records.sqlite3")
+        results['sqlite'] = measure(lambda: store.append("Record", row()), repeat=200)
+    return results
+
+
+def flatten(results):
+    flat = {}
+    for name, metrics in results.items():
+        for metric, stats in metrics.items():
+            flat[name if metric == 'latency' else f"{name}.{metric}"] = stats
+    return flat
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """Return the benchmarks whose p50 got slower than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if base and base.get('p50') and stats['p50'] > base['p50'] * (1 + tolerance):
+            regressions.append((name, base['p50'], stats['p50']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('-k', nargs='+', default=[], help="only run benchmarks whose name contains one of these")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--batch-rows', type=int, default=100_000)
+    parser.add_argument('--compare', help="baseline JSON written by a previous run")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed p50 slowdown before failing")
+    args = parser.parse_args(argv)
+
+    ctx = Context(args.batch_rows)
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        if args.k and not any(pattern in name for pattern in args.k):
+            continue
+        start = time.perf_counter()
+        results[name] = fn(ctx)
+        print(f"{name} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    flat = flatten(results)
+
+    print(f"{'benchmark':<32} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'n':>6}")
+    for name, stats in flat.items():
+        print(f"{name:<32} {stats['p50'] * 1000:>10.3f} {stats['p95'] * 1000:>10.3f} "
+              f"{stats['p99'] * 1000:>10.3f} {stats['n']:>6}")
+
+    if args.output:
+        meta = {'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"), 'commit': git_commit(),
+                'python': platform.python_version(), 'machine': platform.machine(),
+                'dataset': DATASET.exists()}
+        with open(args.output, "w") as f:
+            json.dump({'meta': meta, 'results': flat}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(flat, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before * 1000:.3f} ms -> {after * 1000:.3f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Peer-group statistics for comparing a patient with similar people in the dataset.
+
+``CohortIndex`` is built once per dataset version. For every
+``Sex`` x ``Age_Category`` x ``Heart_Disease`` group (plus an "All" stratum
+over heart disease status) and every numeric feature it stores the mean and a
+quantile sketch of ``resolution`` evenly spaced quantiles. A percentile lookup
+is a binary search in one sketch, so requests never touch the raw rows.
+"""
+import numpy as np
+
+from data import NUMERIC
+
+ALL = "All"
+STRATA = ['Sex', 'Age_Category', 'Heart_Disease']
+
+
+def ordinal(value):
+    """``value`` rounded to a whole number with its ordinal suffix: "1st", "22nd", "13th"."""
+    n = int(round(value))
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+class CohortIndex:
+    """Means and quantile sketches per peer group and numeric feature."""
+
+    def __init__(self, keys, features, sketches, means, counts):
+        self.keys = {key: i for i, key in enumerate(keys)}
+        self.features = {feature: i for i, feature in enumerate(features)}
+        self.sketches = sketches
+        self.means = means
+        self.counts = counts
+        self.levels = np.linspace(0.0, 100.0, sketches.shape[2])
+
+    @classmethod
+    def build(cls, df, features=NUMERIC, resolution=1001):
+        quantiles = np.linspace(0.0, 1.0, resolution)
+        keys, sketches, means, counts = [], [], [], []
+
+        def add(key, group):
+            values = group[features].to_numpy(dtype=np.float64)
+            keys.append(key)
+            sketches.append(np.nanquantile(values, quantiles, axis=0).T.astype(np.float32))
+            means.append(np.nanmean(values, axis=0))
+            counts.append(len(group))
+
+        for (sex, age, status), group in df.groupby(STRATA, observed=True):
+            add((str(sex), str(age), str(status)), group)
+        for (sex, age), group in df.groupby(STRATA[:2], observed=True):
+            add((str(sex), str(age), ALL), group)
+        return cls(keys, list(features), np.stack(sketches), np.array(means), np.array(counts))
+
+    def group(self, sex, age, status=ALL):
+        try:
+            return self.keys[(sex, age, status)]
+        except KeyError:
+            raise KeyError(f"No peer group for Sex={sex!r}, Age_Category={age!r}, Heart_Disease={status!r}") from None
+
+    def percentile(self, feature, value, sex, age, status=ALL):
+        """Percentile (0-100) of ``value`` among the peer group's ``feature`` values."""
+        sketch = self.sketches[self.group(sex, age, status), self.features[feature]]
+        lo = np.searchsorted(sketch, value, side='left')
+        hi = np.searchsorted(sketch, value, side='right')
+        if lo != hi:
+            #value is tied with part of the sketch (e.g. many zeros): use the middle of the tie
+            return float(self.levels[lo] + self.levels[hi - 1]) / 2
+        if lo == 0:
+            return 0.0
+        if lo == len(sketch):
+            return 100.0
+        left, right = sketch[lo - 1], sketch[lo]
+        fraction = (value - left) / (right - left)
+        return float(self.levels[lo - 1] + fraction * (self.levels[lo] - self.levels[lo - 1]))
+
+    def median(self, feature, sex, age, status=ALL):
+        sketch = self.sketches[self.group(sex, age, status), self.features[feature]]
+        return float(sketch[len(sketch) // 2])
+
+    def mean(self, feature, sex, age, status=ALL):
+        return float(self.means[self.group(sex, age, status), self.features[feature]])
+
+    def compare(self, row, sex, age):
+        """Peer comparison for every numeric feature in ``row``.
+
+        Returns ``{feature: {"value", "percentile", "median", "mean", "percentile_no", "percentile_yes"}}``
+        where the ``_no``/``_yes`` percentiles are within peers without/with heart disease.
+        """
+        result = {}
+        for feature in self.features:
+            if feature not in row:
+                continue
+            value = float(row[feature])
+            stats = {'value': value,
+                     'percentile': self.percentile(feature, value, sex, age),
+                     'median': self.median(feature, sex, age),
+                     'mean': self.mean(feature, sex, age)}
+            for status, name in (('No', 'percentile_no'), ('Yes', 'percentile_yes')):
+                if (sex, age, status) in self.keys:
+                    stats[name] = self.percentile(feature, value, sex, age, status)
+            result[feature] = stats
+        return result
@@ -0,0 +1,105 @@
+"""Pre-aggregated statistics and figures for the Home dashboard.
+
+``summarize`` reduces the dataset to a handful of small tables (group counts,
+BMI quartiles and histogram bins) once per dataset version. The figure
+builders only ever see those tables, so the browser receives a few hundred
+points instead of every row.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.express import bar, sunburst
+
+#Part of the summary cache key: bump when the summary tables change so disk-persisted ones are rebuilt
+SUMMARY_VERSION = 2
+
+
+def _box_stats(values):
+    v = np.sort(values.to_numpy(dtype=np.float64))
+    q1, median, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+    #Tukey fences: the most extreme points still within 1.5 IQR of the box
+    lower = v[np.searchsorted(v, q1 - 1.5 * iqr)]
+    upper = v[np.searchsorted(v, q3 + 1.5 * iqr, side='right') - 1]
+    return pd.Series({'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lower,
+                      'upperfence': upper, 'mean': v.mean(), 'count': len(v)})
+
+
+def _as_str(frame, columns):
+    return frame.astype({col: str for col in columns})
+
+
+def smoking_counts(df):
+    counts = df.groupby(['Smoking_History', 'Heart_Disease'], observed=True).size()
+    return _as_str(counts.reset_index(name='count'), ['Smoking_History', 'Heart_Disease'])
+
+
+def bmi_quartiles(df):
+    data = df[['Alcohol_Consumption', 'Heart_Disease', 'BMI']].dropna()
+    stats = data.groupby(['Alcohol_Consumption', 'Heart_Disease'], observed=True)['BMI'].apply(_box_stats)
+    return _as_str(stats.unstack().reset_index(), ['Heart_Disease'])
+
+
+def sunburst_totals(df):
+    data = df[['Sex', 'Heart_Disease', 'Age_Category']].assign(alcohol=df['Alcohol_Consumption'].astype(np.float64))
+    groups = data.groupby(['Sex', 'Heart_Disease', 'Age_Category'], observed=True)['alcohol']
+    #Slices are sized by patients; plotly colours a parent with the count-weighted mean of its leaves,
+    #which is the parent's own mean alcohol consumption
+    totals = groups.agg(count='size', color='mean').reset_index()
+    totals['color'] = totals['color'].fillna(0)
+    return _as_str(totals, ['Sex', 'Heart_Disease', 'Age_Category'])
+
+
+def bmi_histogram(df, bins=30):
+    data = df[['BMI', 'Heart_Disease']].dropna()
+    bmi = data['BMI'].to_numpy(dtype=np.float64)
+    edges = np.linspace(bmi.min(), bmi.max(), bins + 1)
+    frames = []
+    for status, group in data.groupby('Heart_Disease', observed=True)['BMI']:
+        counts, _ = np.histogram(group.to_numpy(dtype=np.float64), bins=edges)
+        frames.append(pd.DataFrame({'BMI': (edges[:-1] + edges[1:]) / 2, 'count': counts,
+                                    'Heart_Disease': str(status)}))
+    return pd.concat(frames, ignore_index=True), edges[1] - edges[0]
+
+
+def summarize(df):
+    """Compute every table the dashboard figures need."""
+    histogram_bins, bin_width = bmi_histogram(df)
+    return {'smoking': smoking_counts(df),
+            'bmi_box': bmi_quartiles(df),
+            'sunburst': sunburst_totals(df),
+            'bmi_hist': histogram_bins,
+            'bmi_bin_width': bin_width}
+
+
+def smoking_figure(summary):
+    return bar(summary['smoking'], x="Smoking_History", y="count", color='Heart_Disease', barmode='group',
+               title="Smoking history vs Heart Disease",
+               labels={"Smoking_History": "Smoking History", "Heart_Disease": "Heart Disease"},
+               category_orders={"Smoking_History": ["Yes", "No"]})
+
+
+def bmi_box_figure(summary):
+    fig = go.Figure()
+    for status, group in summary['bmi_box'].groupby('Heart_Disease'):
+        fig.add_trace(go.Box(name=status, x=group['Alcohol_Consumption'], q1=group['q1'],
+                             median=group['median'], q3=group['q3'], lowerfence=group['lowerfence'],
+                             upperfence=group['upperfence'], mean=group['mean'], boxpoints=False))
+    fig.update_layout(boxmode='group', legend_title_text="Heart Disease",
+                      title="BMI Distribution across Alcohol Consumption on Heart Disease Status",
+                      xaxis_title="Alcohol Consumption", yaxis_title="BMI")
+    return fig
+
+
+def sunburst_figure(summary):
+    return sunburst(summary['sunburst'], path=['Sex', 'Heart_Disease', 'Age_Category'], values='count',
+                    color='color', labels={"count": "Patients", "color": "Mean Alcohol Consumption (days)"},
+                    title='Analysis of Sex, Age category and the presence of Heart disease')
+
+
+def bmi_histogram_figure(summary):
+    fig = bar(summary['bmi_hist'], x="BMI", y="count", color="Heart_Disease",
+              labels={"Heart_Disease": "Heart Disease"}, title="BMI vs Heart Disease")
+    fig.update_traces(width=summary['bmi_bin_width'])
+    fig.update_layout(bargap=0)
+    return fig
@@ -0,0 +1,89 @@
+"""Compact loading of the CVD dataset.
+
+``load_dataset`` streams the CSV in chunks, stores categorical columns as
+``category`` and numeric columns as float32, and persists the result as an
+uncompressed Arrow IPC file keyed by the source file's hash. Later startups
+memory-map that file instead of parsing the CSV again: the float32 columns
+(which have no nulls in the cleaned dataset) become zero-copy views of the
+mapped pages, and only the small category code arrays are copied.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CACHE_DIR = Path(".cache")
+
+CATEGORICAL = ['General_Health', 'Checkup', 'Exercise', 'Heart_Disease', 'Skin_Cancer',
+               'Other_Cancer', 'Depression', 'Diabetes', 'Arthritis', 'Sex',
+               'Age_Category', 'Smoking_History']
+NUMERIC = ['Height_(cm)', 'Weight_(kg)', 'BMI', 'Alcohol_Consumption', 'Fruit_Consumption',
+           'Green_Vegetables_Consumption', 'FriedPotato_Consumption']
+
+DTYPES = {**{col: 'category' for col in CATEGORICAL}, **{col: np.float32 for col in NUMERIC}}
+
+
+def file_hash(path, block_size=1 << 20):
+    """Return the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    path = Path(path)
+    return Path(cache_dir) / f"{path.stem}-{file_hash(path)[:16]}.arrow"
+
+
+def dataset_version(df):
+    """Return the source hash a frame from ``load_dataset`` was built from."""
+    return df.attrs.get("version")
+
+
+def read_csv_compact(path, chunk_size=50_000):
+    """Stream a CSV in chunks into a DataFrame with compact dtypes."""
+    chunks = list(pd.read_csv(path, chunksize=chunk_size, dtype=DTYPES))
+    if not chunks:
+        return pd.read_csv(path, dtype=DTYPES)
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals(parts, sort_categories=True)
+        else:
+            columns[col] = np.concatenate([part.to_numpy() for part in parts])
+    return pd.DataFrame(columns)
+
+
+def load_dataset(path, cache_dir=CACHE_DIR, chunk_size=50_000):
+    """Load ``path`` from its Arrow cache, building the cache on first use.
+
+    The returned frame carries the source hash in ``df.attrs["version"]`` so
+    derived statistics can be cached per dataset version.
+    """
+    import pyarrow.feather as feather
+
+    target = cache_path(path, cache_dir)
+    if target.exists():
+        #split_blocks keeps each null-free numeric column as a view of the mapped file
+        df = feather.read_table(target, memory_map=True).to_pandas(split_blocks=True)
+    else:
+        df = read_csv_compact(path, chunk_size)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        #A private temporary file per writer, so processes building the cache at once cannot interleave
+        with tempfile.NamedTemporaryFile(dir=target.parent, prefix=target.stem, suffix=".tmp", delete=False) as f:
+            tmp = f.name
+        try:
+            feather.write_feather(df, tmp, compression="uncompressed")
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    df.attrs["version"] = target.stem.rsplit("-", 1)[-1]
+    return df
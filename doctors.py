@@ -0,0 +1,96 @@
+"""Cardiologist directory with a per-state index and nearest-doctor search.
+
+The Excel workbook is parsed once and cached as an Arrow file keyed by the
+workbook's hash. ``DoctorDirectory`` keeps the row positions of every state
+and a haversine ``BallTree`` over the coordinates so lookups never re-scan or
+re-parse the table.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data import CACHE_DIR, cache_path
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def load_table(path, cache_dir=CACHE_DIR):
+    """Read the directory workbook into a typed DataFrame, using the Arrow cache when present."""
+    import pyarrow.feather as feather
+
+    target = cache_path(path, cache_dir)
+    if target.exists():
+        return feather.read_table(target, memory_map=True).to_pandas()
+    df = pd.read_excel(path)
+    df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+    df['lng'] = pd.to_numeric(df['lng'], errors='coerce')
+    #Mixed text/number columns (phone, zip) are stored as plain str objects so Arrow can type them;
+    #missing text becomes "" rather than pd.NA, which plotly cannot serialize
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].astype("string").fillna("").astype(object)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    #A private temporary file per writer, so processes building the cache at once cannot interleave
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=target.stem, suffix=".tmp", delete=False) as f:
+        tmp = f.name
+    try:
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return df
+
+
+class DoctorDirectory:
+    """Read-only view over the cardiologist table."""
+
+    def __init__(self, table):
+        self.table = table.reset_index(drop=True)
+        #States in order of first appearance, like Series.unique()
+        codes, states = pd.factorize(self.table['State'])
+        self.states = list(states)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(self.states) + 1))
+        self._by_state = {state: order[bounds[i]:bounds[i + 1]] for i, state in enumerate(self.states)}
+        self._located = np.flatnonzero(self.table[['lat', 'lng']].notna().all(axis=1).to_numpy())
+        self._tree = None
+
+    @classmethod
+    def from_file(cls, path, cache_dir=CACHE_DIR):
+        return cls(load_table(path, cache_dir))
+
+    def in_state(self, state):
+        """Return the doctors practising in ``state`` (a copy safe to modify)."""
+        rows = self._by_state.get(state, np.empty(0, dtype=np.intp))
+        return self.table.iloc[rows].copy()
+
+    def _ball_tree(self):
+        if self._tree is None:
+            from sklearn.neighbors import BallTree
+
+            coords = np.radians(self.table[['lat', 'lng']].to_numpy(dtype=np.float64)[self._located])
+            self._tree = BallTree(coords, metric='haversine')
+        return self._tree
+
+    def nearest(self, lat, lng, k=5):
+        """Return the ``k`` doctors closest to (``lat``, ``lng``) with a ``Distance (km)`` column."""
+        k = min(k, len(self._located))
+        if k == 0:
+            return self.table.iloc[[]].assign(**{'Distance (km)': []})
+        distances, indices = self._ball_tree().query(np.radians([[lat, lng]]), k=k)
+        result = self.table.iloc[self._located[indices[0]]].copy()
+        result['Distance (km)'] = distances[0] * EARTH_RADIUS_KM
+        return result
+
+
+def doctor_map(frame, zoom, hover_data=("Address",)):
+    """Scatter map of the doctors in ``frame``."""
+    from plotly.express import scatter_mapbox
+
+    fig = scatter_mapbox(frame, lat="lat", lon="lng", hover_name="City", hover_data=list(hover_data),
+                         color_discrete_sequence=["red"], zoom=zoom)
+    fig.update_layout(mapbox_style="open-street-map")
+    fig.update_layout(margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    return fig
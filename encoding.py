@@ -0,0 +1,116 @@
+"""Precompiled feature encoding for the CVD model.
+
+The model was trained on ordinal codes produced by an ``OrdinalEncoder`` with
+the category orderings in ``CATEGORIES``. ``FeatureEncoder`` builds the lookup
+tables for those orderings once so a submitted form (or a whole cohort) can be
+turned into a float32 feature matrix without fitting anything per request.
+"""
+import numpy as np
+import pandas as pd
+
+#Column order the model was trained with
+FEATURES = ['General_Health',
+            'Checkup',
+            'Exercise',
+            'Skin_Cancer',
+            'Other_Cancer',
+            'Depression',
+            'Diabetes',
+            'Arthritis',
+            'Sex',
+            'Age_Category',
+            'Height_(cm)',
+            'Weight_(kg)',
+            'BMI',
+            'Smoking_History',
+            'Alcohol_Consumption',
+            'Fruit_Consumption',
+            'Green_Vegetables_Consumption',
+            'FriedPotato_Consumption']
+
+#Category orderings used when the model was trained (do not reorder)
+CATEGORIES = {'General_Health': ['Poor', 'Very Good', 'Good', 'Fair', 'Excellent'],
+              'Checkup': ['Within the past 2 years', 'Within the past year', '5 or more years ago', 'Within the past 5 years', 'Never'],
+              'Exercise': ['No', 'Yes'],
+              'Skin_Cancer': ['No', 'Yes'],
+              'Other_Cancer': ['No', 'Yes'],
+              'Depression': ['No', 'Yes'],
+              'Diabetes': ['No', 'Yes', 'No, pre-diabetes or borderline diabetes', 'Yes, but female told only during pregnancy'],
+              'Arthritis': ['Yes', 'No'],
+              'Sex': ['Female', 'Male'],
+              'Age_Category': ['70-74', '60-64', '75-79', '80+', '65-69', '50-54', '45-49', '18-24', '30-34', '55-59', '35-39', '40-44', '25-29'],
+              'Smoking_History': ['Yes', 'No']}
+
+NUMERIC = [col for col in FEATURES if col not in CATEGORIES]
+
+
+class FeatureEncoder:
+    """Maps raw feature values to the model's float32 input matrix."""
+
+    def __init__(self, categories=CATEGORIES, features=FEATURES):
+        self.features = list(features)
+        self.categories = {col: list(values) for col, values in categories.items()}
+        self.lookup = {col: {value: np.float32(code) for code, value in enumerate(values)}
+                       for col, values in self.categories.items()}
+        self._columns = [(i, col, self.lookup.get(col)) for i, col in enumerate(self.features)]
+
+    def encode(self, row):
+        """Encode one mapping of feature name -> raw value into a (1, n) matrix."""
+        X = np.empty((1, len(self.features)), dtype=np.float32)
+        for i, col, table in self._columns:
+            value = row[col]
+            if table is None:
+                X[0, i] = value
+                continue
+            try:
+                X[0, i] = table[value]
+            except KeyError:
+                raise ValueError(f"Found unknown category {value!r} in column {col}") from None
+        return X
+
+    def transform(self, frame):
+        """Encode every row of a DataFrame with the feature columns."""
+        X = np.empty((len(frame), len(self.features)), dtype=np.float32)
+        for i, col, _ in self._columns:
+            values = frame[col]
+            if col not in self.categories:
+                X[:, i] = values.to_numpy(dtype=np.float32)
+                continue
+            codes = pd.Categorical(values, categories=self.categories[col]).codes
+            if (codes < 0).any():
+                unknown = values[codes < 0].unique()[:5]
+                raise ValueError(f"Found unknown categories {list(unknown)} in column {col}")
+            X[:, i] = codes
+        return X
+
+    def frame(self, X):
+        """Wrap an encoded matrix with the column names the model was fitted on."""
+        return pd.DataFrame(X, columns=self.features, copy=False)
+
+
+def verify_against_ordinal(frame, encoder=None):
+    """Check that ``FeatureEncoder`` matches the per-request OrdinalEncoder path."""
+    from sklearn.preprocessing import OrdinalEncoder
+
+    encoder = encoder or FeatureEncoder()
+    df = frame[encoder.features].copy()
+    categorical = [col for col in encoder.features if col in encoder.categories]
+    ordinal_encoder = OrdinalEncoder(categories=[encoder.categories[col] for col in categorical])
+    df[categorical] = ordinal_encoder.fit_transform(df[categorical])
+    expected = df.to_numpy(dtype=np.float32)
+    actual = encoder.transform(frame)
+    if not np.array_equal(expected, actual):
+        rows = np.flatnonzero((expected != actual).any(axis=1))
+        raise AssertionError(f"Encoded features differ on {len(rows)} rows, first at {rows[0]}")
+    for i in range(min(len(frame), 100)):
+        if not np.array_equal(expected[i:i + 1], encoder.encode(frame.iloc[i])):
+            raise AssertionError(f"Single-row encoding differs at row {i}")
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "CVD_cleaned.csv"
+    verify_against_ordinal(pd.read_csv(path))
+    print(f"FeatureEncoder matches OrdinalEncoder on {path}")
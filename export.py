@@ -0,0 +1,81 @@
+"""Export the fitted model to lean inference artifacts.
+
+    python export.py model.joblib --out-dir artifacts
+
+writes
+
+* ``model.ubj``: the native XGBoost booster (no sklearn wrapper to unpickle);
+* ``trees.npz``: the flattened tree arrays evaluated by ``treeeval.TreeEnsemble``;
+
+and checks that both reproduce the joblib model's margins on random inputs.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from encoding import CATEGORIES, FEATURES
+from scoring import iteration_range
+from treeeval import TreeEnsemble
+
+
+def random_features(n, seed=0):
+    """Encoded feature rows covering every category and plausible numeric ranges, with some missing values."""
+    rng = np.random.default_rng(seed)
+    X = np.empty((n, len(FEATURES)), dtype=np.float32)
+    for i, col in enumerate(FEATURES):
+        if col in CATEGORIES:
+            X[:, i] = rng.integers(0, len(CATEGORIES[col]), n)
+        else:
+            X[:, i] = rng.uniform(0, 250, n)
+    X[rng.random(X.shape) < 0.01] = np.nan
+    return X
+
+
+def export(model, out_dir, check_rows=10_000):
+    """Write the artifacts for ``model`` to ``out_dir`` and return their paths."""
+    import xgboost as xgb
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    booster = model.get_booster()
+    trees = iteration_range(model)
+    if trees[1] > 0:
+        booster = booster[trees[0]:trees[1]]
+    paths = {'booster': out_dir / "model.ubj", 'trees': out_dir / "trees.npz"}
+    booster.save_model(paths['booster'])
+    ensemble = TreeEnsemble.from_booster(booster)
+    ensemble.save(paths['trees'])
+
+    if check_rows:
+        X = random_features(check_rows)
+        expected = model.get_booster().inplace_predict(X, iteration_range=trees, predict_type="margin",
+                                                       validate_features=False)
+        native = xgb.Booster(model_file=str(paths['booster']))
+        for name, margin in (('booster', native.inplace_predict(X, predict_type="margin", validate_features=False)),
+                             ('trees', TreeEnsemble.load(paths['trees']).margin(X))):
+            if not np.allclose(margin, expected, atol=1e-4):
+                raise AssertionError(f"Exported {name} margins differ by up to {np.abs(margin - expected).max():.2e}")
+            if not np.array_equal(margin > 0, expected > 0):
+                raise AssertionError(f"Exported {name} labels differ from the joblib model")
+    return paths
+
+
+def main(argv=None):
+    from joblib import load
+
+    parser = argparse.ArgumentParser(description="Export model.joblib to native booster and NumPy tree artifacts.")
+    parser.add_argument('model', nargs='?', default='model.joblib')
+    parser.add_argument('--out-dir', default='artifacts')
+    parser.add_argument('--check-rows', type=int, default=10_000, help="random rows to verify (0 to skip)")
+    args = parser.parse_args(argv)
+
+    paths = export(load(args.model), args.out_dir, args.check_rows)
+    for name, path in paths.items():
+        print(f"{name}: {path} ({path.stat().st_size / 1024:.0f} KB)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
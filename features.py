@@ -0,0 +1,171 @@
+"""Declarative input schema: validation and feature derivation.
+
+``SCHEMA`` describes every model feature once: its allowed categories or
+valid range, and how it may be derived from other raw inputs. ``prepare``
+applies it to one mapping (a submitted form) with plain Python arithmetic, or
+to a whole DataFrame (a cohort file) with column operations only, so the web
+form and bulk scoring share the same transformation without building a frame
+per request:
+
+* heights may be given as ``Height_Feet`` + ``Height_Inches`` and weights as
+  ``Weight_(lb)``; both are converted to metric;
+* food frequencies may be given as ``<Food>_Count`` times ``<Food>_Per``
+  ``Day``/``Week``/``Month`` and are normalized to times per month
+  (day x 30, week x 4), as in the survey the model was trained on;
+* ``BMI`` is derived from height and weight when it is not given.
+
+Values that are missing (including form placeholders such as "Select One")
+or invalid raise ``SchemaError``, naming the offending columns.
+"""
+import math
+from numbers import Real
+
+import numpy as np
+import pandas as pd
+
+from encoding import CATEGORIES, FEATURES
+
+INCH_CM = 2.54
+POUND_KG = 0.45359237
+
+#Times per month for a count given per day, week or month
+FREQUENCY = {'Day': 30, 'Week': 4, 'Month': 1}
+
+FOODS = {'Fruit_Consumption': 'Fruit',
+         'Green_Vegetables_Consumption': 'Green_Vegetables',
+         'FriedPotato_Consumption': 'FriedPotato'}
+
+SCHEMA = {
+    **{col: {'categories': values} for col, values in CATEGORIES.items()},
+    'Height_(cm)': {'range': (25, 300), 'from': 'height'},
+    'Weight_(kg)': {'range': (20, 400), 'from': 'weight'},
+    'BMI': {'range': (5, 150), 'from': 'bmi'},
+    'Alcohol_Consumption': {'range': (0, 30)},
+    **{col: {'range': (0, 150), 'from': 'frequency'} for col in FOODS},
+}
+
+
+class SchemaError(ValueError):
+    """Raised when inputs are missing or invalid; ``problems`` maps column -> offending row positions."""
+
+    def __init__(self, problems, single=False):
+        self.problems = problems
+        details = ", ".join(col if single else f"{col} ({len(rows)} rows, first at {rows[0]})"
+                            for col, rows in problems.items())
+        super().__init__(f"Missing or invalid values: {details}")
+
+
+def _numeric(frame, col):
+    if col not in frame:
+        return pd.Series(np.nan, index=frame.index)
+    return pd.to_numeric(frame[col], errors='coerce')
+
+
+def _height(frame):
+    feet_inches = (_numeric(frame, 'Height_Feet') * 12 + _numeric(frame, 'Height_Inches')) * INCH_CM
+    return _numeric(frame, 'Height_(cm)').fillna(feet_inches)
+
+
+def _weight(frame):
+    return _numeric(frame, 'Weight_(kg)').fillna(_numeric(frame, 'Weight_(lb)') * POUND_KG)
+
+
+def _frequency(frame, col):
+    prefix = FOODS[col]
+    if f"{prefix}_Per" not in frame:
+        return _numeric(frame, col)
+    #Accepts "Day" as well as the form's "Per Day"; anything else becomes NaN
+    factor = frame[f"{prefix}_Per"].astype(str).str.removeprefix("Per ").map(FREQUENCY)
+    return _numeric(frame, col).fillna(_numeric(frame, f"{prefix}_Count") * factor)
+
+
+def _scalar(value):
+    """A number as ``pd.to_numeric(errors='coerce')`` would read it, NaN otherwise."""
+    if isinstance(value, Real) and not isinstance(value, bool):
+        return value.item() if hasattr(value, "item") else value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _missing(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _prepare_row(data):
+    """``prepare`` for one mapping, following the same ``SCHEMA`` as the frame path."""
+    features, problems = {}, {}
+    for col in FEATURES:
+        spec = SCHEMA[col]
+        source = spec.get('from')
+        value = data.get(col) if 'categories' in spec else _scalar(data.get(col))
+        if source == 'height' and _missing(value):
+            value = (_scalar(data.get('Height_Feet')) * 12 + _scalar(data.get('Height_Inches'))) * INCH_CM
+        elif source == 'weight' and _missing(value):
+            value = _scalar(data.get('Weight_(lb)')) * POUND_KG
+        elif source == 'frequency' and _missing(value) and f"{FOODS[col]}_Per" in data:
+            factor = FREQUENCY.get(str(data[f"{FOODS[col]}_Per"]).removeprefix("Per "), math.nan)
+            value = _scalar(data.get(f"{FOODS[col]}_Count")) * factor
+        elif source == 'bmi' and _missing(value):
+            height = features['Height_(cm)']
+            #Rounded like the frame path (NumPy's rounding, not round()); a zero height is already invalid
+            value = float(np.round(features['Weight_(kg)'] / (height / 100) ** 2, 2)) if height else math.nan
+        if 'categories' in spec:
+            bad = value not in spec['categories']
+        else:
+            low, high = spec['range']
+            bad = not (low <= value <= high)
+        if bad:
+            problems[col] = [0]
+        features[col] = value
+    if problems:
+        raise SchemaError(problems, single=True)
+    return features
+
+
+def check(features):
+    """Boolean masks of the missing or invalid rows per column (only columns with problems)."""
+    problems = {}
+    for col in FEATURES:
+        spec = SCHEMA[col]
+        if 'categories' in spec:
+            bad = ~features[col].isin(spec['categories'])
+        else:
+            low, high = spec['range']
+            bad = ~features[col].between(low, high)
+        if bad.any():
+            problems[col] = bad
+    return problems
+
+
+def prepare(data):
+    """Validate raw inputs and return the model's ``FEATURES``.
+
+    ``data`` is one mapping, for which a dict is returned, or a DataFrame, for
+    which a DataFrame with the ``FEATURES`` columns (same index) is returned.
+    """
+    if not isinstance(data, pd.DataFrame):
+        return _prepare_row(data)
+    frame = data
+    features = pd.DataFrame(index=frame.index)
+    for col in FEATURES:
+        source = SCHEMA[col].get('from')
+        if 'categories' in SCHEMA[col]:
+            features[col] = frame[col] if col in frame else None
+        elif source == 'height':
+            features[col] = _height(frame)
+        elif source == 'weight':
+            features[col] = _weight(frame)
+        elif source == 'frequency':
+            features[col] = _frequency(frame, col)
+        elif source == 'bmi':
+            #FEATURES lists height and weight before BMI
+            derived = (features['Weight_(kg)'] / (features['Height_(cm)'] / 100) ** 2).round(2)
+            features[col] = _numeric(frame, col).fillna(derived)
+        else:
+            features[col] = _numeric(frame, col)
+    problems = check(features)
+    if problems:
+        raise SchemaError({col: np.flatnonzero(mask.to_numpy()).tolist() for col, mask in problems.items()})
+    return features
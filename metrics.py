@@ -0,0 +1,238 @@
+"""Process-wide hot-path instrumentation.
+
+* ``span(stage)`` times a block into the ``silent_heart_stage_seconds``
+  histogram and, when the block raises, counts the error by stage and
+  exception type in ``silent_heart_errors_total``. An exception is counted
+  once, under the innermost stage, however many spans or ``error`` calls
+  it passes through;
+* ``cache(name, hit)`` counts cache lookups, exported with a hit ratio, and
+  ``cached(name, cache)`` does the counting for a cached loader such as the
+  app's ``st.cache_resource`` functions;
+* ``render_prometheus()`` returns everything in the Prometheus text format and
+  ``serve(port)`` exposes it on ``/metrics`` (and ``/metrics.json``).
+
+Each finished span and error is also logged as one JSON line on the
+``silent_heart.metrics`` logger at INFO level, for log-based pipelines.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("silent_heart.metrics")
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    #Label value escaping of the Prometheus text exposition format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = [*labels, *extra]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Registry:
+    """Thread-safe counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1.0, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge (a value that can go up and down, e.g. a drift statistic)."""
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = float(value)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+
+    def error(self, stage, exc):
+        """Count ``exc`` under ``stage`` unless an inner span or call already counted it."""
+        if getattr(exc, "_silent_heart_counted", False):
+            return
+        try:
+            exc._silent_heart_counted = True
+        except AttributeError:
+            pass
+        kind = type(exc).__name__
+        self.inc("silent_heart_errors_total", stage=stage, type=kind)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'event': 'error', 'stage': stage, 'type': kind, 'ts': time.time()}))
+
+    @contextmanager
+    def span(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            self.error(stage, exc)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe("silent_heart_stage_seconds", seconds, stage=stage, **labels)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({'event': 'span', 'stage': stage, 'seconds': round(seconds, 6),
+                                        **labels, 'ts': time.time()}))
+
+    def cache(self, name, hit):
+        self.inc("silent_heart_cache_requests_total", cache=name, result="hit" if hit else "miss")
+
+    def snapshot(self):
+        """Counters, histograms and cache hit ratios as plain data."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: {**hist, 'buckets': list(hist['buckets'])} for key, hist in self._histograms.items()}
+        ratios = defaultdict(lambda: {'hit': 0.0, 'miss': 0.0})
+        for (name, labels), value in counters.items():
+            if name == "silent_heart_cache_requests_total":
+                label = dict(labels)
+                ratios[label['cache']][label['result']] += value
+        hit_ratio = {cache: counts['hit'] / (counts['hit'] + counts['miss'])
+                     for cache, counts in ratios.items() if counts['hit'] + counts['miss']}
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms, 'cache_hit_ratio': hit_ratio}
+
+    def render_json(self):
+        snapshot = self.snapshot()
+        return json.dumps({
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in snapshot['counters'].items()],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                       for (name, labels), value in snapshot['gauges'].items()],
+            'histograms': [{'name': name, 'labels': dict(labels), 'count': hist['count'], 'sum': hist['sum'],
+                            'buckets': dict(zip(map(_format_bound, BUCKETS), hist['buckets']))}
+                           for (name, labels), hist in snapshot['histograms'].items()],
+            'cache_hit_ratio': snapshot['cache_hit_ratio'],
+        })
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(snapshot['counters'].items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), value in sorted(snapshot['gauges'].items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} gauge")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), hist in sorted(snapshot['histograms'].items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            for bound, count in zip(BUCKETS, hist['buckets']):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+        if snapshot['cache_hit_ratio']:
+            lines.append("# TYPE silent_heart_cache_hit_ratio gauge")
+            for cache, ratio in sorted(snapshot['cache_hit_ratio'].items()):
+                lines.append(f"silent_heart_cache_hit_ratio{_format_labels([('cache', cache)])} {ratio:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+span = REGISTRY.span
+inc = REGISTRY.inc
+gauge = REGISTRY.gauge
+observe = REGISTRY.observe
+error = REGISTRY.error
+cache = REGISTRY.cache
+render_prometheus = REGISTRY.render_prometheus
+render_json = REGISTRY.render_json
+
+_lookups = threading.local()
+
+
+def cached(name, cache, registry=REGISTRY):
+    """Apply the caching decorator ``cache`` to a loader and count its hits and misses.
+
+    The loader body only runs on a miss, so it marks the current lookup as one
+    and is timed as a ``load <name>`` span. Lookups are tracked per thread, so
+    nested cached loaders are counted separately.
+    """
+    def decorate(loader):
+        @functools.wraps(loader)
+        def load(*args, **kwargs):
+            stack = getattr(_lookups, "stack", None)
+            if stack:
+                stack[-1] = True
+            with registry.span(f"load {name}"):
+                return loader(*args, **kwargs)
+
+        cached_load = cache(load)
+
+        @functools.wraps(loader)
+        def lookup(*args, **kwargs):
+            stack = _lookups.__dict__.setdefault("stack", [])
+            stack.append(False)
+            try:
+                return cached_load(*args, **kwargs)
+            finally:
+                registry.cache(name, hit=not stack.pop())
+
+        lookup.clear = getattr(cached_load, "clear", None)
+        return lookup
+    return decorate
+
+
+def serve(port, address="", registry=REGISTRY):
+    """Expose ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.render_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = registry.render_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
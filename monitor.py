@@ -0,0 +1,255 @@
+"""Drift and prediction-quality monitoring over the record stream.
+
+    python monitor.py                  # process new rows once and print the report
+    python monitor.py --watch 300      # every 5 minutes, serving gauges on --metrics-port
+
+``Reference`` summarizes CVD_cleaned.csv once: decile bin edges and
+proportions for each numeric feature and category proportions for each
+categorical one (plus the Heart_Disease rate, compared with the predicted
+rate). ``DriftMonitor`` keeps the same fixed-size histograms and counts for
+the live Record rows, with exponential decay (``half_life`` records) so the
+statistics follow recent traffic, plus a rolling window of doctor
+validations. Each run only reads the rows after the stored cursors, and the
+state is a small JSON file, so memory and work do not grow with the sheets.
+
+Numeric features are compared with PSI and with the KS distance between the
+binned CDFs; categorical ones with PSI. ``THRESHOLDS`` turn these and the
+rolling accuracy into alerts, which are logged to ``silent_heart.monitor``
+and exported through ``metrics``.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from data import CACHE_DIR
+from encoding import CATEGORIES, NUMERIC
+
+logger = logging.getLogger("silent_heart.monitor")
+
+STATE_PATH = CACHE_DIR / "monitor.json"
+
+CATEGORICAL = {**CATEGORIES, 'Heart_Disease': ['No', 'Yes']}
+OTHER = "Other"
+
+THRESHOLDS = {'psi': 0.2, 'ks': 0.1, 'accuracy': 0.8, 'min_records': 100, 'min_validations': 30}
+
+
+def psi(actual, expected, eps=1e-4):
+    """Population stability index between two proportion vectors."""
+    actual = np.clip(np.asarray(actual, dtype=np.float64), eps, None)
+    expected = np.clip(np.asarray(expected, dtype=np.float64), eps, None)
+    actual, expected = actual / actual.sum(), expected / expected.sum()
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(actual, expected):
+    """Largest gap between the CDFs of two proportion vectors over the same bins."""
+    return float(np.max(np.abs(np.cumsum(actual) / np.sum(actual) - np.cumsum(expected) / np.sum(expected))))
+
+
+class Reference:
+    """Training-distribution summary the live sketches are compared with."""
+
+    def __init__(self, edges, numeric, categorical, version=None):
+        self.edges = {col: np.asarray(values, dtype=np.float64) for col, values in edges.items()}
+        self.numeric = {col: np.asarray(values, dtype=np.float64) for col, values in numeric.items()}
+        self.categorical = categorical
+        self.version = version
+
+    @classmethod
+    def build(cls, df, bins=10):
+        edges, numeric, categorical = {}, {}, {}
+        for col in NUMERIC:
+            values = df[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            #Zero-heavy columns (consumption) give repeated quantiles; keep unique edges
+            edges[col] = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+            numeric[col] = np.bincount(np.searchsorted(edges[col], values, side='right'),
+                                       minlength=len(edges[col]) + 1) / len(values)
+        for col, values in CATEGORICAL.items():
+            counts = df[col].astype(str).value_counts(normalize=True)
+            categorical[col] = {value: float(counts.get(value, 0.0)) for value in values}
+            categorical[col][OTHER] = float(1.0 - sum(categorical[col].values()))
+        return cls(edges, numeric, categorical, version=df.attrs.get("version"))
+
+    @classmethod
+    def from_file(cls, path="CVD_cleaned.csv"):
+        from data import load_dataset
+
+        return cls.build(load_dataset(path))
+
+
+class DriftMonitor:
+    """Constant-memory sketches of the live records and doctor validations."""
+
+    def __init__(self, reference, half_life=1000, window=200, thresholds=THRESHOLDS):
+        self.reference = reference
+        self.half_life = half_life
+        self.thresholds = thresholds
+        self.cursors = {'Record': 0, 'Validation': 0}
+        self.numeric = {col: np.zeros(len(edges) + 1) for col, edges in reference.edges.items()}
+        self.categorical = {col: dict.fromkeys([*values, OTHER], 0.0) for col, values in CATEGORICAL.items()}
+        self.weight = 0.0
+        self.records = 0
+        self.validations = deque(maxlen=window)
+        self.validated = 0
+        self.correct = 0
+
+    def _decay(self, n):
+        factor = 0.5 ** (n / self.half_life) if self.half_life else 1.0
+        for counts in self.numeric.values():
+            counts *= factor
+        for counts in self.categorical.values():
+            for value in counts:
+                counts[value] *= factor
+        self.weight *= factor
+
+    def update_records(self, frame):
+        """Add Record rows (features plus the predicted ``Heart_Disease``)."""
+        if not len(frame):
+            return
+        self._decay(len(frame))
+        for col, edges in self.reference.edges.items():
+            values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            self.numeric[col] += np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        for col, counts in self.categorical.items():
+            observed = frame[col].astype(str).where(frame[col].astype(str).isin(CATEGORICAL[col]), OTHER)
+            for value, n in observed.value_counts().items():
+                counts[value] += n
+        self.weight += len(frame)
+        self.records += len(frame)
+
+    def update_validations(self, frame):
+        """Add Validation rows; ``Validation`` is "Correct" when the doctor agreed with the model."""
+        outcomes = frame['Validation'].astype(str)
+        outcomes = outcomes[outcomes.isin(['Correct', 'Wrong'])] == 'Correct'
+        self.validations.extend(outcomes.tolist())
+        self.validated += len(outcomes)
+        self.correct += int(outcomes.sum())
+
+    def process(self, store):
+        """Read and add the rows written since the last call. Returns the number of new rows per worksheet."""
+        new = {}
+        for worksheet, update in (('Record', self.update_records), ('Validation', self.update_validations)):
+            frame = store.read(worksheet, since=self.cursors[worksheet])
+            update(frame)
+            if len(frame):
+                self.cursors[worksheet] = int(frame.index.max())
+            new[worksheet] = len(frame)
+        return new
+
+    def report(self):
+        """Drift statistics, rolling accuracy and the alerts they trigger."""
+        t = self.thresholds
+        features = {}
+        for col, counts in self.numeric.items():
+            if counts.sum():
+                expected = self.reference.numeric[col]
+                features[col] = {'psi': psi(counts, expected), 'ks': ks(counts, expected)}
+        for col, counts in self.categorical.items():
+            actual = np.array(list(counts.values()))
+            if actual.sum():
+                expected = [self.reference.categorical[col][value] for value in counts]
+                features[col] = {'psi': psi(actual, expected)}
+        window = len(self.validations)
+        accuracy = {'rolling': sum(self.validations) / window if window else None, 'window': window,
+                    'overall': self.correct / self.validated if self.validated else None,
+                    'validated': self.validated}
+
+        alerts = []
+        if self.records >= t['min_records']:
+            for col, stats in features.items():
+                for stat in ('psi', 'ks'):
+                    if stats.get(stat, 0.0) > t[stat]:
+                        alerts.append({'check': stat, 'feature': col, 'value': stats[stat], 'threshold': t[stat]})
+        if window >= t['min_validations'] and accuracy['rolling'] < t['accuracy']:
+            alerts.append({'check': 'accuracy', 'value': accuracy['rolling'], 'threshold': t['accuracy']})
+        return {'records': self.records, 'effective_records': self.weight, 'features': features,
+                'accuracy': accuracy, 'alerts': alerts}
+
+    def publish(self, report):
+        """Export ``report`` as ``metrics`` gauges and log its alerts."""
+        for col, stats in report['features'].items():
+            for stat, value in stats.items():
+                metrics.gauge(f"silent_heart_drift_{stat}", value, feature=col)
+        if report['accuracy']['rolling'] is not None:
+            metrics.gauge("silent_heart_rolling_accuracy", report['accuracy']['rolling'])
+        for alert in report['alerts']:
+            metrics.inc("silent_heart_alerts_total", check=alert['check'], feature=alert.get('feature', ''))
+            logger.warning(json.dumps({'event': 'alert', **alert, 'ts': time.time()}))
+
+    def state(self):
+        return {'reference_version': self.reference.version, 'cursors': self.cursors,
+                'numeric': {col: counts.tolist() for col, counts in self.numeric.items()},
+                'categorical': self.categorical, 'weight': self.weight, 'records': self.records,
+                'validations': list(self.validations), 'validated': self.validated, 'correct': self.correct}
+
+    def save(self, path=STATE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.state(), f)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, reference, path=STATE_PATH, **kwargs):
+        """Resume from ``path``; starts fresh when it is missing or was built against another dataset version."""
+        monitor = cls(reference, **kwargs)
+        path = Path(path)
+        if not path.exists():
+            return monitor
+        with open(path) as f:
+            state = json.load(f)
+        if state['reference_version'] != reference.version:
+            return monitor
+        monitor.cursors = state['cursors']
+        monitor.numeric = {col: np.asarray(counts) for col, counts in state['numeric'].items()}
+        monitor.categorical = state['categorical']
+        monitor.weight, monitor.records = state['weight'], state['records']
+        monitor.validations.extend(state['validations'])
+        monitor.validated, monitor.correct = state['validated'], state['correct']
+        return monitor
+
+
+def main(argv=None):
+    from storage import open_store
+
+    parser = argparse.ArgumentParser(description="Track feature drift and model accuracy over the record stream.")
+    parser.add_argument('--dataset', default='CVD_cleaned.csv', help="training data used as the reference")
+    parser.add_argument('--state', default=str(STATE_PATH))
+    parser.add_argument('--store', default=None, help="record store backend (default: SILENT_HEART_STORE)")
+    parser.add_argument('--half-life', type=int, default=1000, help="records after which old rows weigh half")
+    parser.add_argument('--window', type=int, default=200, help="doctor validations in the rolling accuracy")
+    parser.add_argument('--watch', type=float, default=None, help="repeat every this many seconds")
+    parser.add_argument('--metrics-port', type=int, default=None, help="serve the gauges at /metrics")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    store = open_store(args.store)
+    reference = Reference.from_file(args.dataset)
+    monitor = DriftMonitor.load(reference, args.state, half_life=args.half_life, window=args.window)
+    while True:
+        new = monitor.process(store)
+        report = monitor.report()
+        monitor.publish(report)
+        monitor.save(args.state)
+        print(json.dumps({'new_rows': new, **report}, indent=2))
+        if args.watch is None:
+            return 1 if report['alerts'] else 0
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Versioned model artifacts and hot-swapping.
+
+``train.py`` publishes every accepted model as a new version directory
+
+    models/
+        v0001/model.ubj         native booster
+        v0001/meta.json         parent version, store cursors, holdout metrics, params
+        v0001/calibration.json  optional, otherwise the global calibration is used
+        LATEST                  name of the version to serve
+
+and only then rewrites ``LATEST``, so readers never see a partial version.
+``ModelRegistry`` is a drop-in for ``RiskScorer`` that checks ``LATEST`` every
+few seconds and swaps in the new version when it changes; requests already
+running keep the scorer they started with.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from scoring import CALIBRATION_PATH, RiskScorer, load_calibration
+
+MODELS_DIR = Path(os.environ.get("SILENT_HEART_MODELS", "models"))
+
+_VERSION = re.compile(r"v(\d+)$")
+
+
+def versions(root=MODELS_DIR):
+    """Published version names, oldest first."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    found = [path.name for path in root.iterdir() if path.is_dir() and _VERSION.match(path.name)]
+    return sorted(found, key=lambda name: int(name[1:]))
+
+
+def latest(root=MODELS_DIR):
+    """The version ``LATEST`` points to, or None before anything was published."""
+    try:
+        return (Path(root) / "LATEST").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_meta(version, root=MODELS_DIR):
+    with open(Path(root) / version / "meta.json") as f:
+        return json.load(f)
+
+
+def publish_version(booster, meta, root=MODELS_DIR, calibration=None):
+    """Write ``booster`` as the next version and point ``LATEST`` at it. Returns the version name."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    existing = versions(root)
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    staging = root / f".{version}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+    booster.save_model(staging / "model.ubj")
+    with open(staging / "meta.json", "w") as f:
+        json.dump({**meta, 'version': version, 'published': time.time()}, f, indent=2)
+    if calibration is not None:
+        with open(staging / "calibration.json", "w") as f:
+            json.dump(calibration, f)
+    staging.rename(root / version)
+    pointer = root / "LATEST.tmp"
+    pointer.write_text(version)
+    pointer.replace(root / "LATEST")
+    return version
+
+
+def load_version(version, root=MODELS_DIR, encoder=None):
+    """A ``RiskScorer`` over a published version."""
+    import xgboost as xgb
+
+    directory = Path(root) / version
+    booster = xgb.Booster(model_file=str(directory / "model.ubj"))
+    calibration_path = directory / "calibration.json"
+    calibration = load_calibration(calibration_path if calibration_path.exists() else CALIBRATION_PATH)
+    return RiskScorer(booster, encoder, calibration)
+
+
+class ModelRegistry:
+    """Scores with the latest published version, reloading it when ``LATEST`` changes.
+
+    ``fallback`` builds the scorer used while nothing has been published
+    (normally the ``model.joblib`` one).
+    """
+
+    def __init__(self, root=MODELS_DIR, encoder=None, fallback=None, check_interval=5.0):
+        self.root = Path(root)
+        self.check_interval = check_interval
+        self._encoder = encoder
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.version = None
+        self._scorer = None
+
+    def current(self):
+        """The scorer for the latest version (checked at most every ``check_interval`` seconds)."""
+        now = time.monotonic()
+        if self._scorer is not None and now - self._checked < self.check_interval:
+            return self._scorer
+        with self._lock:
+            if self._scorer is None or now - self._checked >= self.check_interval:
+                version = latest(self.root)
+                if self._scorer is None or version != self.version:
+                    if version is not None:
+                        self._scorer = load_version(version, self.root, self._encoder)
+                    elif self._scorer is None:
+                        self._scorer = self._fallback() if self._fallback else None
+                        if self._scorer is None:
+                            raise FileNotFoundError(f"No model published in {self.root}")
+                    self.version = version
+                self._checked = now
+        return self._scorer
+
+    def versioned(self):
+        """``(version, scorer)`` currently in use, read together so a concurrent swap cannot split them.
+
+        ``version`` is None while the fallback scorer is in use.
+        """
+        self.current()
+        with self._lock:
+            return self.version, self._scorer
+
+    @property
+    def encoder(self):
+        return self.current().encoder
+
+    def predict_proba(self, X):
+        return self.current().predict_proba(X)
+
+    def score(self, X, explain=False):
+        return self.current().score(X, explain=explain)
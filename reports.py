@@ -0,0 +1,159 @@
+"""Health record reports (PDF and CSV) for single predictions and whole cohorts.
+
+``ReportRenderer`` keeps a prebuilt page layout (title, fonts, margins) and
+only writes the per-patient body on top of a copy of it. Rendered reports are
+cached by a hash of their inputs, so Streamlit reruns with unchanged inputs
+reuse the same bytes. ``write_bulk`` renders one PDF per row of a scored
+cohort into a zip archive:
+
+    python reports.py scored.csv -o reports.zip
+"""
+import argparse
+import copy
+import hashlib
+import json
+import sys
+import threading
+import zipfile
+from collections import OrderedDict
+
+import metrics
+
+#(label, record key); a key of None is a heading line without a value
+REPORT_FIELDS = [('Name', 'Name'),
+                 ('Sex', 'Sex'),
+                 ('Age Category', 'Age_Category'),
+                 ('Height(cm)', 'Height_(cm)'),
+                 ('Weight(kg)', 'Weight_(kg)'),
+                 ('BMI', 'BMI'),
+                 ('General Health', 'General_Health'),
+                 ('Checkup', 'Checkup'),
+                 ('Smoking history', 'Smoking_History'),
+                 ('Skin Cancer', 'Skin_Cancer'),
+                 ('Other Cancer', 'Other_Cancer'),
+                 ('Depression', 'Depression'),
+                 ('Diabetes', 'Diabetes'),
+                 ('Arthritis', 'Arthritis'),
+                 ('Data in the past one month(30 days)', None),
+                 ('Exercise', 'Exercise'),
+                 ('Alcohol Consumption', 'Alcohol_Consumption'),
+                 ('Fruit Consumption', 'Fruit_Consumption'),
+                 ('Green Vegetables Consumption', 'Green_Vegetables_Consumption'),
+                 ('Fried Potato Consumption', 'FriedPotato_Consumption')]
+
+RISK_LINE = "The risk of developing Cardiovascular Disease (CVD) is:"
+
+
+def _plain(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def report_key(record):
+    """Stable hash of the values a report is rendered from."""
+    payload = json.dumps({k: _plain(v) for k, v in record.items()}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def report_text(record):
+    lines = [f"{label}:" if key is None else f"{label}:{record.get(key, '')}" for label, key in REPORT_FIELDS]
+    return "\n\n".join(lines) + f"\n\n\n\n{RISK_LINE}{record.get('Risk', '')}"
+
+
+class ReportRenderer:
+    """Renders health record PDFs from a prebuilt template, with an LRU cache."""
+
+    def __init__(self, maxsize=256):
+        from fpdf import FPDF
+
+        template = FPDF()
+        template.add_page()
+        template.set_font("Arial", size=18, style="B")
+        template.cell(0, 10, txt="Health Record", ln=1, align="C")
+        template.set_font("Arial", size=15)
+        self._template = template
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, kind, record, render):
+        key = (kind, report_key(record))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                metrics.cache(f"report {kind}", hit=True)
+                return self._cache[key]
+        metrics.cache(f"report {kind}", hit=False)
+        with metrics.span(f"render {kind}"):
+            data = render(record)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = data
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return data
+
+    def _render_pdf(self, record):
+        pdf = copy.deepcopy(self._template)
+        pdf.multi_cell(0, 5, txt=report_text(record), align="L")
+        return pdf.output(dest="S").encode("latin-1", errors="replace")
+
+    def _render_csv(self, record):
+        import pandas as pd
+
+        return pd.DataFrame([record]).to_csv(index=False).encode("utf-8")
+
+    def pdf(self, record):
+        """PDF bytes for ``record`` (feature values plus ``Name`` and ``Risk``)."""
+        return self._cached("pdf", record, self._render_pdf)
+
+    def csv(self, record):
+        """CSV bytes with a single row for ``record``."""
+        return self._cached("csv", record, self._render_csv)
+
+
+def cohort_records(frame, start=0):
+    """Yield report records for a cohort scored by ``batch.py``."""
+    for i, row in enumerate(frame.to_dict("records"), start):
+        record = {key: row.get(key, '') for _, key in REPORT_FIELDS if key is not None}
+        name = row.get('Name')
+        record['Name'] = name if isinstance(name, str) and name else f"Patient {i + 1}"
+        record['Risk'] = 'HIGH' if row.get('Predicted_Heart_Disease') == 'Yes' else 'LOW'
+        yield record
+
+
+def write_bulk(frames, target, renderer=None):
+    """Write one PDF per cohort row into the zip archive ``target`` (path or file).
+
+    ``frames`` is a DataFrame or an iterable of DataFrame chunks.
+    """
+    if hasattr(frames, "to_dict"):
+        frames = [frames]
+    renderer = renderer or ReportRenderer(maxsize=0)
+    count = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for frame in frames:
+            for record in cohort_records(frame, count):
+                count += 1
+                name = "".join(c if c.isalnum() or c in " -_" else "_" for c in str(record['Name']))
+                archive.writestr(f"{count:06d} {name}.pdf", renderer.pdf(record))
+    return count
+
+
+def main(argv=None):
+    from batch import read_chunks
+
+    parser = argparse.ArgumentParser(description="Write a PDF health record for every row of a scored cohort.")
+    parser.add_argument('input', help="CSV or Parquet file written by batch.py")
+    parser.add_argument('-o', '--output', default='reports.zip', help="zip archive to write")
+    args = parser.parse_args(argv)
+
+    count = write_bulk(read_chunks(args.input, 10_000), args.output)
+    print(f"Wrote {count} reports to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Calibrated risk scores and per-feature explanations.
+
+``RiskScorer`` works on the booster inside the fitted ``XGBClassifier``:
+
+* risk scores are the margin passed through a Platt calibration fitted on
+  held-out labels by ``train.py`` (per published version, or
+  ``calibration.json`` for ``model.joblib``); it is the identity when no
+  calibration was fitted, which reproduces ``predict_proba``;
+* labels are the calibrated risk above ``threshold``. ``fit_calibration``
+  stores the calibrated risk at margin 0 as the threshold (0.5 for the
+  identity), so labels stay exactly ``XGBClassifier.predict``'s however the
+  scores are calibrated, and still agree with the displayed risk;
+* explanations are XGBoost's native TreeSHAP contributions
+  (``pred_contribs=True``), computed for a whole batch in one call. Each row's
+  contributions plus the bias sum to its margin.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from encoding import FeatureEncoder
+
+CALIBRATION_PATH = Path("calibration.json")
+
+
+def load_calibration(path=CALIBRATION_PATH):
+    """Return the Platt ``{"a", "b"}`` parameters, or the identity when the file is missing."""
+    path = Path(path)
+    if not path.exists():
+        return {"a": 1.0, "b": 0.0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def fit_calibration(margins, labels, path=None):
+    """Fit Platt scaling ``sigmoid(a * margin + b)`` to held-out labels (e.g. doctor validations)."""
+    from sklearn.linear_model import LogisticRegression
+
+    lr = LogisticRegression(C=1e6)
+    lr.fit(np.asarray(margins, dtype=np.float64).reshape(-1, 1), np.asarray(labels, dtype=int))
+    calibration = {"a": float(lr.coef_[0, 0]), "b": float(lr.intercept_[0])}
+    #The calibrated risk at margin 0: as a > 0, risk > threshold exactly when margin > 0
+    calibration["threshold"] = float(1.0 / (1.0 + np.exp(-calibration["b"])))
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(calibration, f)
+    return calibration
+
+
+def iteration_range(model):
+    """Trees ``XGBClassifier.predict`` uses: up to the best iteration when early stopping was used."""
+    try:
+        return (0, model.best_iteration + 1)
+    except AttributeError:
+        return (0, 0)
+
+
+class RiskScorer:
+    """Vectorized labels, calibrated probabilities and contributions for encoded rows."""
+
+    def __init__(self, model, encoder=None, calibration=None, ensemble=None):
+        self.model = model
+        #Either the fitted XGBClassifier or a bare (already truncated) Booster
+        self.booster = model.get_booster() if hasattr(model, "get_booster") else model
+        self.encoder = encoder or FeatureEncoder()
+        self.calibration = calibration or load_calibration()
+        #Calibrations without a stored threshold keep the margin > 0 rule too
+        self.threshold = self.calibration.get("threshold", float(self.calibrate(0.0)))
+        self.feature_names = self.booster.feature_names or self.encoder.features
+        self.iteration_range = iteration_range(model)
+        self.ensemble = ensemble
+
+    def margin(self, X):
+        if self.ensemble is not None:
+            #Memory-mapped tree arrays shared with other processes (see ``shared``)
+            return self.ensemble.margin(X)
+        #inplace_predict skips DMatrix construction; the column order is fixed by FeatureEncoder
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range, predict_type="margin",
+                                            validate_features=False)
+
+    def calibrate(self, margin):
+        a, b = self.calibration["a"], self.calibration["b"]
+        return 1.0 / (1.0 + np.exp(-(a * np.asarray(margin, dtype=np.float64) + b)))
+
+    def predict_proba(self, X):
+        """Calibrated probability of heart disease for each encoded row."""
+        return self.calibrate(self.margin(X))
+
+    def contributions(self, X):
+        """TreeSHAP contributions, one column per feature plus ``Bias``."""
+        dmatrix = xgb.DMatrix(X, feature_names=self.feature_names)
+        contribs = self.booster.predict(dmatrix, pred_contribs=True, iteration_range=self.iteration_range)
+        return pd.DataFrame(contribs, columns=[*self.encoder.features, 'Bias'])
+
+    def score(self, X, explain=False):
+        """Return ``label`` (0/1), ``risk`` (calibrated) and optionally ``contributions``."""
+        risk = self.calibrate(self.margin(X))
+        result = {'label': (risk > self.threshold).astype(int), 'risk': risk}
+        if explain:
+            result['contributions'] = self.contributions(X)
+        return result
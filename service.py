@@ -0,0 +1,257 @@
+"""Low-latency HTTP inference service.
+
+A small tornado application (tornado ships with Streamlit) that loads the
+model once per process and scores JSON payloads with the same inputs the
+Prediction form accepts, validated and derived by ``features.prepare``:
+
+    POST /predict  {"General_Health": "Good", ..., "FriedPotato_Consumption": 4}
+    POST /predict  {"instances": [{...}, {...}], "explain": false}
+    GET  /health
+    GET  /metrics   (Prometheus text format, see ``metrics``)
+
+Concurrent requests are coalesced by ``MicroBatcher`` into one vectorized
+predict call. The batcher is adaptive: when requests arrive one at a time each
+is scored immediately; under load, everything queued while the previous batch
+was being scored (plus a short wait window) goes into the next batch.
+
+    python service.py --port 8600
+
+The Streamlit app can embed the service (``SILENT_HEART_SERVICE_PORT``) or
+score through a running one (``SILENT_HEART_SERVICE_URL``, see ``score_remote``).
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from features import prepare
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def parse_payload(payload):
+    """Return ``(rows, explain)`` from a single-row, list or ``{"instances": [...]}`` payload."""
+    explain = False
+    if isinstance(payload, dict) and "instances" in payload:
+        explain = bool(payload.get("explain", False))
+        rows = payload["instances"]
+    elif isinstance(payload, dict):
+        explain = bool(payload.pop("explain", False))
+        rows = [payload]
+    else:
+        rows = payload
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Expected a feature object, a list of them, or {\"instances\": [...]}")
+    return rows, explain
+
+
+def format_predictions(result):
+    predictions = []
+    for i, (label, risk) in enumerate(zip(result['label'], result['risk'])):
+        prediction = {'heart_disease': 'Yes' if label else 'No',
+                      'risk': 'HIGH' if label else 'LOW',
+                      'risk_score': float(risk)}
+        if 'contributions' in result:
+            prediction['contributions'] = {k: float(v) for k, v in result['contributions'].iloc[i].items()}
+        predictions.append(prediction)
+    return predictions
+
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests into single vectorized calls."""
+
+    def __init__(self, scorer, max_batch=1024, max_wait=0.002):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+        self.batches = 0
+        self.rows = 0
+        self._load = 1.0
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, X, explain=False):
+        """Score the encoded rows ``X`` and return the scorer's result dict for them."""
+        loop = asyncio.get_running_loop()
+        if explain:
+            #Explanations are rare and heavier; score them directly instead of holding up a batch
+            return await loop.run_in_executor(self.executor, lambda: self.scorer.score(X, explain=True))
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        items = [await self._queue.get()]
+        rows = len(items[0][0])
+        loop = asyncio.get_running_loop()
+        #Only wait for stragglers when recent batches show concurrent traffic
+        deadline = loop.time() + (self.max_wait if self._load > 1.5 else 0.0)
+        while rows < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            items.append(item)
+            rows += len(item[0])
+        self._load = 0.8 * self._load + 0.2 * len(items)
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            X = np.concatenate([x for x, _ in items]) if len(items) > 1 else items[0][0]
+            try:
+                with metrics.span("service batch"):
+                    result = await loop.run_in_executor(self.executor, self.scorer.score, X)
+            except Exception as exc:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.rows += len(X)
+            start = 0
+            for x, future in items:
+                end = start + len(x)
+                if not future.done():
+                    future.set_result({key: value[start:end] for key, value in result.items()})
+                start = end
+
+
+def make_app(scorer, max_batch=1024, max_wait=0.002):
+    import tornado.web
+
+    batcher = MicroBatcher(scorer, max_batch=max_batch, max_wait=max_wait)
+
+    class PredictHandler(tornado.web.RequestHandler):
+        async def post(self):
+            try:
+                rows, explain = parse_payload(json.loads(self.request.body))
+                #Same validation and derivations (feet/inches, pounds, counts per week) as the app's form
+                X = np.concatenate([scorer.encoder.encode(prepare(row)) for row in rows])
+            except (ValueError, KeyError, TypeError) as exc:
+                metrics.error("service request", exc)
+                self.set_status(400)
+                self.write({'error': f"{type(exc).__name__}: {exc}"})
+                return
+            with metrics.span("service predict", explain=explain):
+                result = await batcher.submit(X, explain)
+            self.write({'predictions': format_predictions(result)})
+
+    class HealthHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.write({'status': 'ok', 'batches': batcher.batches, 'rows': batcher.rows})
+
+    class MetricsHandler(tornado.web.RequestHandler):
+        def get(self):
+            self.set_header("Content-Type", "text/plain; version=0.0.4")
+            self.write(metrics.render_prometheus())
+
+    app = tornado.web.Application([(r"/predict", PredictHandler), (r"/health", HealthHandler),
+                                   (r"/metrics", MetricsHandler)])
+    app.batcher = batcher
+    return app
+
+
+async def serve(scorer, port, address="", **kwargs):
+    app = make_app(scorer, **kwargs)
+    app.listen(port, address=address)
+    await asyncio.Event().wait()
+
+
+def start_in_thread(scorer, port, address="127.0.0.1", timeout=10.0, **kwargs):
+    """Run the service on its own event loop in a daemon thread (for embedding).
+
+    Raises the server's exception (e.g. ``OSError`` when the port is taken)
+    if it fails to start, and ``TimeoutError`` if it is not listening within
+    ``timeout`` seconds.
+    """
+    ready = threading.Event()
+    failure = []
+
+    async def main():
+        try:
+            app = make_app(scorer, **kwargs)
+            app.listen(port, address=address)
+        except Exception as exc:
+            #Handed to the caller instead of dying silently in this thread
+            failure.append(exc)
+            return
+        finally:
+            ready.set()
+        await asyncio.Event().wait()
+
+    thread = threading.Thread(target=lambda: asyncio.run(main()), name="inference-service", daemon=True)
+    thread.start()
+    if not ready.wait(timeout):
+        raise TimeoutError(f"Inference service did not start on {address}:{port} within {timeout}s")
+    if failure:
+        raise failure[0]
+    return thread
+
+
+def score_remote(url, rows, explain=False, timeout=5.0):
+    """Score feature rows through a running service.
+
+    Returns the same ``label``/``risk``/``contributions`` dict as ``RiskScorer.score``.
+    """
+    body = json.dumps({'instances': rows, 'explain': explain}, default=_json_default).encode("utf-8")
+    request = urllib.request.Request(url.rstrip("/") + "/predict", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        predictions = json.loads(response.read())['predictions']
+    result = {'label': np.array([p['heart_disease'] == 'Yes' for p in predictions], dtype=int),
+              'risk': np.array([p['risk_score'] for p in predictions])}
+    if explain:
+        import pandas as pd
+
+        result['contributions'] = pd.DataFrame([p['contributions'] for p in predictions])
+    return result
+
+
+def main(argv=None):
+    from joblib import load
+
+    from registry import MODELS_DIR, ModelRegistry
+    from scoring import RiskScorer
+
+    parser = argparse.ArgumentParser(description="Serve the Silent Heart model over HTTP.")
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--address', default="")
+    parser.add_argument('-m', '--model', default='model.joblib', help="model artifact to load")
+    parser.add_argument('--models', default=str(MODELS_DIR),
+                        help="versioned models published by train.py; the latest is hot-swapped in")
+    parser.add_argument('--max-batch', type=int, default=1024, help="largest coalesced batch (rows)")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="longest wait for a batch to fill under load")
+    args = parser.parse_args(argv)
+
+    scorer = ModelRegistry(args.models, fallback=lambda: RiskScorer(load(args.model)))
+    scorer.current()
+    print(f"Serving on port {args.port}", file=sys.stderr)
+    asyncio.run(serve(scorer, args.port, args.address, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
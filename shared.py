@@ -0,0 +1,189 @@
+"""Share the model, dataset and doctor directory between worker processes.
+
+``st.cache_resource`` only deduplicates within one process, so every replica
+behind a load balancer would otherwise hold its own copy of everything. A
+supervisor publishes read-only artifacts once and starts the workers:
+
+    python shared.py --workers 4 --port 8501
+
+The shared directory (``/dev/shm/silent-heart`` where available, so it lives
+in shared memory) contains
+
+* ``trees/``: the ``treeeval.TreeEnsemble`` arrays as ``.npy`` files;
+* ``model.ubj``: the native booster, only used for explanations;
+* ``dataset.arrow`` and ``doctors.arrow``: uncompressed Arrow IPC files;
+* ``manifest.json``: versions, written last so a worker never attaches to a
+  half-written publish.
+
+Workers get ``SILENT_HEART_SHARED`` pointing at the directory and ``attach``
+to it. Arrays and Arrow buffers are memory-mapped read-only, so their pages
+are shared by all workers instead of being copied into each one.
+
+The shared trees serve until ``train.py`` publishes a model version; workers
+still go through ``registry.ModelRegistry``, so they then hot-swap to the new
+version (loaded by each worker) like a single-process app.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SHARED_ENV = "SILENT_HEART_SHARED"
+
+
+def default_dir():
+    shm = Path("/dev/shm")
+    return shm / "silent-heart" if shm.is_dir() else Path(".cache") / "shared"
+
+
+def _install(source, target):
+    """Copy ``source`` over ``target`` atomically; processes mapping the old file keep their view."""
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.copyfile(source, tmp)
+    tmp.replace(target)
+
+
+def publish(directory, model_path="model.joblib", dataset_path="CVD_cleaned.csv",
+            doctors_path="Cardiologist_List.xlsx"):
+    """Write the shared artifacts to ``directory`` and return the manifest."""
+    from joblib import load
+
+    from data import cache_path, load_dataset
+    from doctors import load_table
+    from export import export
+    from treeeval import TreeEnsemble
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    staging = directory / "staging"
+    paths = export(load(model_path), staging)
+    TreeEnsemble.load(paths['trees']).save_dir(staging / "trees")
+    trees = directory / "trees"
+    if trees.exists():
+        shutil.rmtree(trees)
+    (staging / "trees").replace(trees)
+    _install(paths['booster'], directory / "model.ubj")
+    shutil.rmtree(staging)
+
+    dataset = load_dataset(dataset_path)
+    _install(cache_path(dataset_path), directory / "dataset.arrow")
+    load_table(doctors_path)
+    _install(cache_path(doctors_path), directory / "doctors.arrow")
+
+    manifest = {'dataset_version': dataset.attrs["version"], 'doctors': str(doctors_path),
+                'model': str(model_path), 'published': time.time()}
+    tmp = directory / "manifest.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    tmp.replace(directory / "manifest.json")
+    return manifest
+
+
+class SharedResources:
+    """Read-only views over a published directory."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "manifest.json") as f:
+            self.manifest = json.load(f)
+
+    def ensemble(self):
+        from treeeval import TreeEnsemble
+
+        return TreeEnsemble.load_dir(self.directory / "trees", mmap_mode="r")
+
+    def booster(self):
+        import xgboost as xgb
+
+        return xgb.Booster(model_file=str(self.directory / "model.ubj"))
+
+    def scorer(self, encoder=None):
+        """A ``RiskScorer`` whose margins come from the shared tree arrays."""
+        from scoring import RiskScorer
+
+        return RiskScorer(self.booster(), encoder, ensemble=self.ensemble())
+
+    def _table(self, name):
+        import pyarrow.feather as feather
+
+        #split_blocks keeps null-free numeric columns as zero-copy views of the mapped file
+        return feather.read_table(self.directory / name, memory_map=True).to_pandas(split_blocks=True)
+
+    def dataset(self):
+        df = self._table("dataset.arrow")
+        df.attrs["version"] = self.manifest['dataset_version']
+        return df
+
+    def doctors(self):
+        return self._table("doctors.arrow")
+
+
+def attach(directory=None):
+    """Attach to the directory in ``SILENT_HEART_SHARED``; None when sharing is not enabled."""
+    directory = directory or os.environ.get(SHARED_ENV)
+    if not directory:
+        return None
+    return SharedResources(directory)
+
+
+def supervise(directory, workers, port, streamlit_args=(), poll=1.0):
+    """Run ``workers`` Streamlit processes on consecutive ports, restarting any that exit."""
+    env = {**os.environ, SHARED_ENV: str(directory)}
+
+    def spawn(i):
+        return subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py",
+                                 "--server.port", str(port + i), "--server.headless", "true",
+                                 *streamlit_args], env=env)
+
+    processes = [spawn(i) for i in range(workers)]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while not stopping:
+            time.sleep(poll)
+            for i, process in enumerate(processes):
+                if process.poll() is not None and not stopping:
+                    print(f"worker {i} exited with {process.returncode}, restarting", file=sys.stderr)
+                    processes[i] = spawn(i)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish shared read-only artifacts and run Streamlit workers.")
+    parser.add_argument('--dir', default=None, help="shared directory (default: /dev/shm/silent-heart)")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8501, help="port of the first worker")
+    parser.add_argument('--model', default='model.joblib')
+    parser.add_argument('--dataset', default='CVD_cleaned.csv')
+    parser.add_argument('--doctors', default='Cardiologist_List.xlsx')
+    parser.add_argument('--publish-only', action='store_true', help="write the artifacts and exit")
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    directory = Path(args.dir) if args.dir else default_dir()
+    manifest = publish(directory, args.model, args.dataset, args.doctors)
+    print(f"published dataset {manifest['dataset_version']} to {directory}", file=sys.stderr)
+    if not args.publish_only:
+        supervise(directory, args.workers, args.port, streamlit_args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
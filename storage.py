@@ -0,0 +1,192 @@
+"""Record storage backends for predictions and doctor validations.
+
+Both backends expose the same two operations on the "Record" and
+"Validation" worksheets:
+
+* ``append(worksheet, frame)`` adds rows, skipping those whose ``Key``
+  (the write-behind idempotency key) is already stored;
+* ``read(worksheet, since=0)`` returns the rows after cursor ``since``,
+  indexed by a monotonically increasing row id that can be passed back as
+  the next cursor.
+
+``open_store`` picks the backend from ``SILENT_HEART_STORE`` ("gsheets" by
+default, or "sqlite" for a local embedded store at ``SILENT_HEART_DB``).
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+import metrics
+from encoding import FEATURES, NUMERIC
+
+DB_PATH = Path(".cache") / "records.sqlite3"
+
+#"Submission ID" links a validation to the exact prediction it validates
+WORKSHEETS = {"Record": ['Name', *FEATURES, 'Heart_Disease', 'Submission ID', 'Key'],
+              "Validation": ['Patient Name', 'Model output', 'Doctor output', 'Validation', 'Doctor Name',
+                             'Submission ID', 'Key']}
+
+INDEXES = {"Record": ['Name', 'Heart_Disease', 'Submission ID'],
+           "Validation": ['Patient Name', 'Validation', 'Submission ID']}
+
+
+class RecordStore:
+    """Interface shared by the storage backends."""
+
+    def append(self, worksheet, frame):
+        raise NotImplementedError
+
+    def read(self, worksheet, since=0):
+        raise NotImplementedError
+
+
+def _column_letter(n):
+    """Spreadsheet column name of the ``n``-th column (1 -> "A", 27 -> "AA")."""
+    letters = ""
+    while n:
+        n, rest = divmod(n - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+class GSheetsStore(RecordStore):
+    """Google Sheets backend using a ``streamlit_gsheets`` connection.
+
+    Writes go straight to the gspread worksheet behind the connection, so a
+    batch is one ``append_rows`` call instead of a read and rewrite of the
+    whole sheet, and concurrent writers cannot overwrite each other's rows. Reads
+    fetch only the rows after the cursor, so incremental consumers such as
+    ``monitor`` and ``train`` do not download the whole sheet each time.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._worksheets = {}
+        self._keys = {}
+
+    def _worksheet(self, worksheet):
+        if worksheet not in self._worksheets:
+            #streamlit_gsheets only exposes reads and whole-sheet updates; appends need the gspread worksheet
+            sheet = self.conn.client._select_worksheet(worksheet=worksheet)
+            columns = WORKSHEETS[worksheet]
+            if sheet.row_values(1)[:len(columns)] != columns:
+                sheet.update(range_name="A1", values=[columns])
+            self._worksheets[worksheet] = sheet
+        return self._worksheets[worksheet]
+
+    def read(self, worksheet, since=0):
+        """Rows after cursor ``since``, fetched as one range read; a row's id is its row number below the header."""
+        from gspread.exceptions import APIError
+
+        columns = WORKSHEETS[worksheet]
+        sheet = self._worksheet(worksheet)
+        #Open-ended range: from the first unread row to the end of the data
+        cells = f"A{since + 2}:{_column_letter(len(columns))}"
+        try:
+            with metrics.span("store read", backend="gsheets", worksheet=worksheet):
+                values = sheet.get(cells, value_render_option="UNFORMATTED_VALUE")
+        except APIError as exc:
+            #Nothing has been written past the cursor yet
+            if "exceeds grid limits" not in str(exc):
+                raise
+            values = []
+        rows = [(row + [""] * len(columns))[:len(columns)] for row in values]
+        frame = pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(since + 1, since + 1 + len(rows)), dtype=object)
+        frame = frame.where(frame != "", None).dropna(how="all")
+        for col in columns:
+            if col in NUMERIC:
+                frame[col] = pd.to_numeric(frame[col], errors='coerce')
+        return frame
+
+    def _stored_keys(self, worksheet):
+        #Loaded once per process, then kept up to date by our own appends
+        if worksheet not in self._keys:
+            column = WORKSHEETS[worksheet].index('Key') + 1
+            self._keys[worksheet] = set(self._worksheet(worksheet).col_values(column)[1:])
+        return self._keys[worksheet]
+
+    def append(self, worksheet, frame):
+        frame = frame.reindex(columns=WORKSHEETS[worksheet])
+        keys = self._stored_keys(worksheet)
+        frame = frame[~frame['Key'].isin(keys)].drop_duplicates('Key', keep='last')
+        if not len(frame):
+            return
+        rows = frame.astype(object).where(frame.notna(), "").to_numpy().tolist()
+        rows = [[value.item() if hasattr(value, "item") else value for value in row] for row in rows]
+        sheet = self._worksheet(worksheet)
+        with metrics.span("store write", backend="gsheets", worksheet=worksheet):
+            sheet.append_rows(rows, value_input_option="RAW", insert_data_option="INSERT_ROWS", table_range="A1")
+        keys.update(frame['Key'].dropna())
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteStore(RecordStore):
+    """Local embedded backend with one indexed table per worksheet."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for worksheet, columns in WORKSHEETS.items():
+                types = {col: 'REAL' if col in NUMERIC else 'TEXT' for col in columns}
+                db.execute(f"CREATE TABLE IF NOT EXISTS {_quote(worksheet)} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           + ", ".join(f"{_quote(col)} {kind}" for col, kind in types.items()) + ")")
+                #Stores created before a column existed get it added (empty for the old rows)
+                existing = {row[1] for row in db.execute(f"PRAGMA table_info({_quote(worksheet)})")}
+                for col in columns:
+                    if col not in existing:
+                        db.execute(f"ALTER TABLE {_quote(worksheet)} ADD COLUMN {_quote(col)} {types[col]}")
+                db.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(worksheet + '_Key')} "
+                           f"ON {_quote(worksheet)} ({_quote('Key')})")
+                for col in INDEXES[worksheet]:
+                    index = _quote(f"{worksheet}_{col}".replace(" ", "_"))
+                    db.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {_quote(worksheet)} ({_quote(col)})")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def append(self, worksheet, frame):
+        columns = WORKSHEETS[worksheet]
+        frame = frame.reindex(columns=columns)
+        rows = frame.astype(object).where(frame.notna(), None)
+        names = ", ".join(_quote(col) for col in columns)
+        marks = ", ".join("?" * len(columns))
+        with metrics.span("store write", backend="sqlite", worksheet=worksheet), self._connect() as db:
+            db.execute("BEGIN")
+            #A batch resent after a crash before the spool marked it flushed is skipped row by row
+            db.executemany(f"INSERT INTO {_quote(worksheet)} ({names}) VALUES ({marks}) "
+                           f"ON CONFLICT({_quote('Key')}) DO NOTHING",
+                           rows.itertuples(index=False, name=None))
+            db.execute("COMMIT")
+
+    def read(self, worksheet, since=0):
+        with metrics.span("store read", backend="sqlite", worksheet=worksheet), self._connect() as db:
+            frame = pd.read_sql_query(f"SELECT * FROM {_quote(worksheet)} WHERE id > ? ORDER BY id",
+                                      db, params=(since,), index_col="id")
+        frame.index.name = None
+        return frame
+
+
+def open_store(backend=None):
+    """Open the configured record store."""
+    backend = backend or os.environ.get("SILENT_HEART_STORE", "gsheets")
+    if backend == "sqlite":
+        return SQLiteStore(os.environ.get("SILENT_HEART_DB", DB_PATH))
+    if backend == "gsheets":
+        import streamlit as st
+        from streamlit_gsheets import GSheetsConnection
+
+        return GSheetsStore(st.connection("gsheets", type=GSheetsConnection))
+    raise ValueError(f"Unknown record store backend {backend!r}")
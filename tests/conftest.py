@@ -0,0 +1,34 @@
+"""Shared fixtures. Tests run from the repository root: ``python -m pytest -q``."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from encoding import CATEGORIES, FEATURES  # noqa: E402
+
+
+def feature_frame(n, seed=0):
+    """``n`` synthetic rows with valid values for every model feature."""
+    rng = np.random.default_rng(seed)
+    height = rng.normal(170, 10, n).round(0)
+    weight = rng.normal(80, 15, n).round(2)
+    frame = {col: rng.choice(values, n) for col, values in CATEGORIES.items()}
+    frame.update({'Height_(cm)': height, 'Weight_(kg)': weight, 'BMI': (weight / (height / 100) ** 2).round(2),
+                  'Alcohol_Consumption': rng.integers(0, 31, n).astype(float),
+                  'Fruit_Consumption': rng.integers(0, 121, n).astype(float),
+                  'Green_Vegetables_Consumption': rng.integers(0, 121, n).astype(float),
+                  'FriedPotato_Consumption': rng.integers(0, 61, n).astype(float)})
+    return pd.DataFrame(frame)[FEATURES]
+
+
+@pytest.fixture(scope="session")
+def model():
+    from joblib import load
+
+    return load(ROOT / "model.joblib")
@@ -0,0 +1,61 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import ROOT, feature_frame
+from writebehind import SPOOL_PATH
+
+FORM = {'In what Age category': '45-49', 'Sex': 'Male', 'Feet': 5, 'Inches': 9,
+        'Would you say that in general': 'Good', 'About how long has it been': 'Within the past year',
+        'Not including juices': 'Per Week', 'How often do you eat a green leafy': 'Per Week',
+        'How often do you eat any kind of fried potatoes': 'Per Month',
+        'How many times do you eat fruit': 3, 'How many times do you eat Green Vegetables': 2,
+        'How many times do you eat Fried Potatoes': 1}
+
+
+def find(widgets, prefix):
+    """Widget whose label, or whose placeholder first option, starts with ``prefix``."""
+    for widget in widgets:
+        options = getattr(widget, 'options', None) or []
+        if " ".join(widget.label.split()).startswith(prefix) or (options and str(options[0]).startswith(prefix)):
+            return widget
+    raise LookupError(f"No widget labelled {prefix!r}")
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    """The app's files next to a small synthetic dataset, with a local SQLite record store."""
+    for path in ROOT.iterdir():
+        if path.name not in {"CVD_cleaned.csv", ".cache", "models", "tests"} and not path.name.startswith("."):
+            (tmp_path / path.name).symlink_to(path)
+    frame = feature_frame(3000, seed=2)
+    frame['Heart_Disease'] = np.where(np.random.default_rng(2).random(len(frame)) < 0.1, "Yes", "No")
+    frame.to_csv(tmp_path / "CVD_cleaned.csv", index=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SILENT_HEART_STORE", "sqlite")
+    monkeypatch.setenv("SILENT_HEART_DB", str(tmp_path / "records.sqlite3"))
+    return tmp_path
+
+
+def test_prediction_form_submits_once(app_dir):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(app_dir / "app.py"), default_timeout=120)
+    at.query_params["page"] = "Prediction"
+    at.run()
+    assert not at.exception
+    for prefix, value in FORM.items():
+        find(at.selectbox, prefix).set_value(value)
+    find(at.number_input, 'Weight (kg)').set_value(78.0)
+    find(at.button, "Predict").click()
+    at.run()
+
+    assert not at.exception
+    results = [e.value for e in (*at.success, *at.error)]
+    assert sum(value in ('**LOW**', '**HIGH**') for value in results) == 1
+    prediction = at.session_state.prediction
+    assert prediction['risk'] in ('LOW', 'HIGH') and len(prediction['encoded']) == 18
+    with sqlite3.connect(app_dir / SPOOL_PATH) as db:
+        keys = [key for key, in db.execute("SELECT key FROM spool WHERE worksheet = 'Record'")]
+    assert keys == [f"{prediction['submission_id']}:Record"]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from conftest import feature_frame
+from encoding import FeatureEncoder
+from scoring import RiskScorer, fit_calibration
+
+IDENTITY = {"a": 1.0, "b": 0.0}
+
+
+def test_identity_calibration_reproduces_the_classifier(model):
+    encoder = FeatureEncoder()
+    X = encoder.transform(feature_frame(2000))
+    result = RiskScorer(model, encoder, IDENTITY).score(X)
+    np.testing.assert_array_equal(result['label'], model.predict(encoder.frame(X)))
+    np.testing.assert_allclose(result['risk'], model.predict_proba(encoder.frame(X))[:, 1], rtol=1e-5)
+
+
+def test_labels_do_not_change_after_calibration(model):
+    encoder = FeatureEncoder()
+    X = encoder.transform(feature_frame(5000, seed=1))
+    before = RiskScorer(model, encoder, IDENTITY)
+    margins = before.margin(X)
+    #Held-out labels with a low positive rate, like the dataset's ~8%
+    rng = np.random.default_rng(0)
+    labels = rng.random(len(margins)) < 1.0 / (1.0 + np.exp(-(margins - 2.5)))
+    calibration = fit_calibration(margins, labels)
+    after = RiskScorer(model, encoder, calibration)
+
+    scored_before, scored_after = before.score(X), after.score(X)
+    assert not np.allclose(scored_before['risk'], scored_after['risk'])
+    np.testing.assert_array_equal(scored_before['label'], scored_after['label'])
+    np.testing.assert_array_equal(scored_after['label'], (scored_after['risk'] > after.threshold).astype(int))
+    np.testing.assert_array_equal(after.predict_proba(X), scored_after['risk'])
+
+
+def test_calibration_without_threshold_keeps_the_margin_rule(model):
+    encoder = FeatureEncoder()
+    X = encoder.transform(feature_frame(2000, seed=2))
+    scorer = RiskScorer(model, encoder, {"a": 0.8, "b": -2.0})
+    np.testing.assert_array_equal(scorer.score(X)['label'], (scorer.margin(X) > 0).astype(int))
@@ -0,0 +1,55 @@
+import json
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import feature_frame
+from encoding import FeatureEncoder
+from scoring import RiskScorer
+from service import score_remote, start_in_thread
+
+
+@pytest.fixture(scope="module")
+def url(model):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    start_in_thread(RiskScorer(model, FeatureEncoder(), {"a": 1.0, "b": 0.0}), port)
+    return f"http://127.0.0.1:{port}"
+
+
+def post(url, payload):
+    request = urllib.request.Request(url + "/predict", data=json.dumps(payload).encode("utf-8"),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def valid_row():
+    return {k: v.item() if hasattr(v, "item") else v for k, v in feature_frame(1).iloc[0].items()}
+
+
+def test_valid_row_is_scored(url):
+    status, body = post(url, valid_row())
+    assert status == 200
+    assert body['predictions'][0]['risk'] in ('LOW', 'HIGH')
+
+
+def test_form_inputs_are_derived_like_the_app(url):
+    row = valid_row()
+    derived = {**row, 'Height_Feet': 5, 'Height_Inches': 9, 'Weight_(lb)': 180.0}
+    for col in ('Height_(cm)', 'Weight_(kg)', 'BMI'):
+        del derived[col]
+    assert score_remote(url, [derived])['label'].shape == (1,)
+
+
+@pytest.mark.parametrize("col, value", [('Alcohol_Consumption', None), ('Height_(cm)', 1000), ('Exercise', 'Sometimes')])
+def test_invalid_feature_is_rejected(url, col, value):
+    status, body = post(url, {**valid_row(), col: value})
+    assert status == 400
+    assert body['error'].startswith("SchemaError") and col in body['error']
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from conftest import feature_frame
+from storage import SQLiteStore
+
+
+def record_rows(keys):
+    frame = feature_frame(len(keys), seed=len(keys))
+    return frame.assign(Name=keys, Heart_Disease="No", **{'Submission ID': keys, 'Key': keys})
+
+
+def test_read_since_the_returned_cursor_returns_only_new_rows(tmp_path):
+    store = SQLiteStore(tmp_path / "records.sqlite3")
+    store.append("Record", record_rows(["a", "b"]))
+    first = store.read("Record")
+    assert list(first['Name']) == ["a", "b"]
+
+    store.append("Record", record_rows(["c"]))
+    later = store.read("Record", since=int(first.index.max()))
+    assert list(later['Name']) == ["c"]
+    assert later.index.min() > first.index.max()
+    assert store.read("Record", since=int(later.index.max())).empty
+
+
+def test_rows_with_a_stored_key_are_skipped(tmp_path):
+    store = SQLiteStore(tmp_path / "records.sqlite3")
+    store.append("Record", record_rows(["a", "b"]))
+    store.append("Record", record_rows(["b", "c"]))
+    assert list(store.read("Record")['Key']) == ["a", "b", "c"]
+
+
+def test_new_columns_are_added_to_an_existing_store(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "records.sqlite3"
+    with sqlite3.connect(path) as db:
+        db.execute('CREATE TABLE "Validation" (id INTEGER PRIMARY KEY AUTOINCREMENT, "Patient Name" TEXT)')
+        db.execute('INSERT INTO "Validation" ("Patient Name") VALUES (\'old\')')
+    store = SQLiteStore(path)
+    store.append("Validation", pd.DataFrame([{'Patient Name': "new", 'Submission ID': "s1", 'Key': "k1"}]))
+    frame = store.read("Validation")
+    assert list(frame['Patient Name']) == ["old", "new"]
+    assert frame['Submission ID'].isna().tolist() == [True, False]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from conftest import feature_frame
+from storage import SQLiteStore
+from train import booster_params, labelled_rows
+
+
+def records(start, n):
+    frame = feature_frame(n, seed=start)
+    ids = [f"s{i}" for i in range(start, start + n)]
+    return frame.assign(Name=ids, Heart_Disease="LOW", **{'Submission ID': ids, 'Key': [f"{i}:Record" for i in ids]})
+
+
+def validation(submission_id, verdict="HIGH"):
+    return pd.DataFrame([{'Patient Name': submission_id, 'Model output': "LOW", 'Doctor output': verdict,
+                          'Validation': "No", 'Doctor Name': "Dr. A", 'Submission ID': submission_id,
+                          'Key': f"{submission_id}:Validation"}])
+
+
+def test_validation_of_a_record_older_than_the_lookback_is_paired(tmp_path):
+    store = SQLiteStore(tmp_path / "records.sqlite3")
+    store.append("Record", records(0, 30))
+    _, cursors = labelled_rows(store, {})
+    store.append("Record", records(30, 30))
+    store.append("Validation", validation("s1"))
+    store.append("Validation", validation("s45", "LOW"))
+
+    frame, new_cursors = labelled_rows(store, cursors, lookback=10)
+    assert sorted(frame['Name']) == ["s1", "s45"]
+    assert frame.set_index('Name')['label'].to_dict() == {"s1": 1, "s45": 0}
+    assert new_cursors == {'Validation': 2, 'Record': 60}
+
+    frame, _ = labelled_rows(store, new_cursors, lookback=10)
+    assert frame.empty
+
+
+def test_booster_params_round_trip_through_the_saved_config():
+    rng = np.random.default_rng(0)
+    dtrain = xgb.DMatrix(rng.random((200, 4)), label=rng.integers(0, 2, 200))
+    params = {'objective': 'binary:logistic', 'eta': 0.1, 'max_depth': 3, 'subsample': 0.8, 'scale_pos_weight': 2.0}
+    read = booster_params(xgb.train(params, dtrain, num_boost_round=2))
+    assert read['objective'] == 'binary:logistic' and read['max_depth'] == 3
+    assert read['eta'] == pytest.approx(0.1) and read['subsample'] == pytest.approx(0.8)
+    assert read['scale_pos_weight'] == pytest.approx(2.0)
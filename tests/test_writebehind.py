@@ -0,0 +1,58 @@
+import pytest
+
+from writebehind import WriteBehindQueue
+
+
+class Sink:
+    """Collects appended rows and rejects any batch that contains a ``poison`` row."""
+
+    def __init__(self):
+        self.rows = []
+
+    def __call__(self, worksheet, frame):
+        if "poison" in set(frame.get('Name', ())):
+            raise ValueError("rejected")
+        self.rows.extend((worksheet, row['Key']) for row in frame.to_dict("records"))
+
+
+@pytest.fixture
+def sink():
+    return Sink()
+
+
+def test_duplicate_keys_are_sent_once(tmp_path, sink):
+    queue = WriteBehindQueue(sink, tmp_path / "spool.sqlite3")
+    assert queue.put("Record", {'Name': "a"}, key="s1:Record")
+    assert queue.put("Record", {'Name': "a2"}, key="s1:Record")
+    assert queue.flush() == 1
+    assert not queue.put("Record", {'Name': "a3"}, key="s1:Record")
+    assert queue.flush() == 0
+    assert sink.rows == [("Record", "s1:Record")]
+
+
+def test_a_rejected_row_does_not_hold_back_the_others(tmp_path, sink):
+    queue = WriteBehindQueue(sink, tmp_path / "spool.sqlite3", max_attempts=3)
+    queue.put("Record", {'Name': "poison"}, key="bad")
+    for i in range(3):
+        queue.put("Record", {'Name': f"p{i}"}, key=f"k{i}")
+
+    #The rejected row comes first and nothing has gone out yet, so this looks like an outage
+    with pytest.raises(ValueError):
+        queue.flush()
+    assert sink.rows == []
+
+    queue.put("Validation", {'Patient Name': "p0"}, key="v0")
+    with pytest.raises(ValueError):
+        queue.flush()
+    assert sorted(key for _, key in sink.rows) == ["k0", "k1", "k2"]
+    assert queue.pending() == 2
+
+    with pytest.raises(ValueError):
+        queue.flush()
+    assert sink.rows[-1] == ("Validation", "v0")
+    assert queue.pending() == 0
+    assert [(key, attempts) for key, _, _, attempts in queue.dead_letters()] == [("bad", 3)]
+    assert queue.flush() == 0
+
+    assert queue.requeue_dead_letters() == 1
+    assert queue.pending() == 1
@@ -0,0 +1,73 @@
+"""Stage timing for Streamlit script runs.
+
+Streamlit re-executes ``app.py`` on every interaction while imported modules
+stay cached, so this module's globals persist across reruns within a process
+and let each run be reported as either the cold start or a rerun.
+
+Besides wall time, every stage records the CPU time of the thread running it
+(``time.thread_time``). Each session's script runs in its own thread, so this
+is the server CPU cost of one interaction, unaffected by other sessions.
+"""
+import itertools
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger("silent_heart.timing")
+
+PROCESS_START = time.perf_counter()
+_runs = itertools.count()
+
+
+class RunTimer:
+    """Collects named stage durations for one script run."""
+
+    def __init__(self):
+        self.run = next(_runs)
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.stages = []
+
+    @property
+    def cold(self):
+        return self.run == 0
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as one of this run's stages and as a ``metrics`` span."""
+        start, cpu = time.perf_counter(), time.thread_time()
+        try:
+            with metrics.span(name):
+                yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start, time.thread_time() - cpu))
+
+    def report(self):
+        """Return the run's timings as a list of ``{"stage", "seconds", "cpu_seconds"}`` rows."""
+        rows = [{"stage": name, "seconds": round(seconds, 4), "cpu_seconds": round(cpu, 4)}
+                for name, seconds, cpu in self.stages]
+        rows.append({"stage": "total", "seconds": round(time.perf_counter() - self.start, 4),
+                     "cpu_seconds": round(time.thread_time() - self.cpu_start, 4)})
+        if self.cold:
+            rows.append({"stage": "since process start", "seconds": round(time.perf_counter() - PROCESS_START, 4),
+                         "cpu_seconds": round(time.process_time(), 4)})
+        return rows
+
+    def finish(self, page=None):
+        """Log the run's timings and return them."""
+        rows = self.report()
+        kind = "startup" if self.cold else "rerun"
+        metrics.observe("silent_heart_run_seconds", time.perf_counter() - self.start, page=page, kind=kind)
+        metrics.observe("silent_heart_run_cpu_seconds", time.thread_time() - self.cpu_start, page=page, kind=kind)
+        logger.info("%s page=%s run=%d %s", kind, page, self.run,
+                    " ".join(f"{row['stage'].replace(' ', '_')}={row['seconds']:.4f}s/{row['cpu_seconds']:.4f}s_cpu"
+                             for row in rows))
+        return rows
+
+
+def report_enabled():
+    """Whether the timing report should be shown in the app (``SILENT_HEART_TIMINGS=1``)."""
+    return os.environ.get("SILENT_HEART_TIMINGS", "") not in ("", "0")
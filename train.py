@@ -0,0 +1,289 @@
+"""Incremental retraining from collected records and doctor validations.
+
+    python train.py                       # one increment from the configured record store
+    python train.py --rounds 20 --eta 0.05
+    python train.py --dry-run             # evaluate without publishing
+
+Each run reads the Validation rows written since the last published version's
+store cursors and pairs each one with the Record row of the prediction it
+validates, by ``Submission ID``. Rows written before submission ids existed
+cannot be paired reliably and are skipped. The doctor's verdict is the label (HIGH = 1); the model's own
+prediction in the Record sheet is never used as a label. Rows are encoded
+with ``FeatureEncoder`` (the app's category orderings), and boosting
+continues from the latest published booster, or from ``model.joblib`` before
+the first version, rather than starting from zero.
+
+A deterministic fifth of the validated patients (by name hash) is kept out
+of training and added to ``models/holdout.arrow``. Candidates are evaluated
+on that holdout plus a fixed sample of CVD_cleaned.csv, which guards against
+forgetting the original data. A candidate is published with ``registry`` only
+when its holdout log loss is no worse than the current model's (within
+``--tolerance``). Otherwise the cursors do not move, and the rows are
+retried with more data on the next run.
+
+Every published version carries a Platt calibration fitted on the
+validations holdout, or on the reference sample while fewer than
+``min_calibration`` validated patients are held out. ``--calibrate`` fits
+``calibration.json`` for ``model.joblib`` the same way.
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from encoding import CATEGORIES, FEATURES, NUMERIC, FeatureEncoder
+from registry import MODELS_DIR, latest, load_meta, publish_version
+from scoring import CALIBRATION_PATH, fit_calibration, iteration_range
+
+LABELS = {'LOW': 0, 'HIGH': 1}
+
+#Training parameters carried over from the base booster's configuration
+TREE_PARAMS = ['eta', 'max_depth', 'min_child_weight', 'gamma', 'lambda', 'alpha', 'subsample',
+               'colsample_bytree', 'colsample_bylevel', 'colsample_bynode', 'max_bin', 'grow_policy']
+
+
+def _holdout(name, fraction):
+    digest = hashlib.sha1(str(name).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32 < fraction
+
+
+def _latest_records(records):
+    return records.dropna(subset=['Submission ID']).drop_duplicates('Submission ID', keep='last')
+
+
+def labelled_rows(store, cursors, lookback=1000):
+    """Validated records after ``cursors`` as ``(frame, new_cursors)``.
+
+    Records are read from ``lookback`` rows before the Record cursor, so a
+    validation whose record arrived in an earlier increment is usually paired
+    without reading the whole sheet. When some validation's record is older
+    than that, the whole Record sheet is read instead, so the Validation
+    cursor never moves past a validation that could have been paired.
+    """
+    validations = store.read("Validation", since=cursors.get("Validation", 0))
+    since = max(cursors.get("Record", 0) - lookback, 0)
+    records = store.read("Record", since=since)
+    new_cursors = {'Validation': int(validations.index.max()) if len(validations) else cursors.get("Validation", 0),
+                   'Record': max(int(records.index.max()) if len(records) else 0, cursors.get("Record", 0))}
+    validations = validations[validations['Doctor output'].isin(LABELS) & validations['Submission ID'].notna()]
+    validations = validations.drop_duplicates('Submission ID', keep='last')
+    records = _latest_records(records)
+    if since > 0 and not validations['Submission ID'].isin(records['Submission ID']).all():
+        records = _latest_records(store.read("Record"))
+    #The submission id, not the free-text name, identifies the prediction: namesakes and repeat visits stay apart
+    frame = validations.merge(records.drop(columns='Key', errors='ignore'), on='Submission ID', how='inner')
+    for col in NUMERIC:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    known = np.logical_and.reduce([frame[col].isin(values) for col, values in CATEGORIES.items()])
+    frame = frame[known].copy()
+    frame['label'] = frame['Doctor output'].map(LABELS).astype(int)
+    return frame[['Name', *FEATURES, 'label']].reset_index(drop=True), new_cursors
+
+
+def reference_holdout(path="CVD_cleaned.csv", rows=20_000, seed=0):
+    """A fixed sample of the original dataset with its labels."""
+    from data import load_dataset
+
+    df = load_dataset(path)
+    sample = df.sample(n=min(rows, len(df)), random_state=seed)
+    sample = sample[[*FEATURES, 'Heart_Disease']].rename(columns={'Heart_Disease': 'label'})
+    sample['label'] = (sample['label'] == 'Yes').astype(int)
+    return sample.reset_index(drop=True)
+
+
+def joblib_booster(model_path="model.joblib"):
+    """``(booster, params)`` of the fitted ``model.joblib``, truncated to the trees it predicts with."""
+    from joblib import load
+
+    model = load(model_path)
+    booster = model.get_booster()
+    trees = iteration_range(model)
+    if trees[1] > 0:
+        booster = booster[trees[0]:trees[1]]
+    return booster, booster_params(booster)
+
+
+def _config_value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def booster_params(booster):
+    """The objective and tree parameters ``booster`` was trained with, read from its saved config.
+
+    The saved config covers every xgboost version, unlike the sklearn
+    wrapper's ``get_xgb_params``.
+    """
+    learner = json.loads(booster.save_config())['learner']
+    gbtree = learner['gradient_booster']
+    tree = gbtree.get('tree_train_param', {})
+    params = {'objective': learner['learner_train_param']['objective'],
+              'tree_method': gbtree.get('gbtree_train_param', {}).get('tree_method', 'auto'),
+              **{k: _config_value(tree[k]) for k in TREE_PARAMS if k in tree}}
+    scale = learner.get('objective', {}).get('reg_loss_param', {}).get('scale_pos_weight')
+    if scale is not None:
+        params['scale_pos_weight'] = _config_value(scale)
+    return params
+
+
+def base_model(root=MODELS_DIR, model_path="model.joblib"):
+    """``(booster, params, version)`` to continue from: the latest version, else ``model.joblib``."""
+    import xgboost as xgb
+
+    version = latest(root)
+    if version is not None:
+        booster = xgb.Booster(model_file=str(Path(root) / version / "model.ubj"))
+        return booster, load_meta(version, root)['params'], version
+    return (*joblib_booster(model_path), None)
+
+
+def evaluate(booster, encoder, frames):
+    """Log loss and ROC AUC of ``booster`` on each labelled frame."""
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    results = {}
+    for name, frame in frames.items():
+        if not len(frame):
+            continue
+        X = encoder.transform(frame)
+        proba = booster.inplace_predict(X, predict_type="value", validate_features=False)
+        y = frame['label'].to_numpy()
+        results[name] = {'rows': len(frame), 'log_loss': float(log_loss(y, proba, labels=[0, 1]))}
+        if len(np.unique(y)) == 2:
+            results[name]['auc'] = float(roc_auc_score(y, proba))
+    return results
+
+
+def calibrate(booster, encoder, frames, min_calibration=200):
+    """Platt parameters for ``booster`` from held-out labelled rows.
+
+    Uses the validations holdout once it has ``min_calibration`` rows of both
+    classes, since doctors' verdicts are the labels the app is judged on;
+    before that, the reference sample of the original dataset.
+    """
+    validations = frames.get('validations')
+    if validations is not None and len(validations) >= min_calibration and validations['label'].nunique() == 2:
+        frame, source = validations, 'validations'
+    else:
+        frame, source = frames['reference'], 'reference'
+    margins = booster.inplace_predict(encoder.transform(frame), predict_type="margin", validate_features=False)
+    return {**fit_calibration(margins, frame['label'].to_numpy()), 'source': source, 'rows': len(frame)}
+
+
+def stored_holdout(root=MODELS_DIR):
+    """Validated patients held out by earlier increments (``models/holdout.arrow``)."""
+    import pyarrow.feather as feather
+
+    path = Path(root) / "holdout.arrow"
+    if not path.exists():
+        return pd.DataFrame(columns=[*FEATURES, 'label'])
+    return feather.read_feather(path).drop(columns='Name')
+
+
+def calibrate_base(root=MODELS_DIR, model_path="model.joblib", dataset="CVD_cleaned.csv", path=CALIBRATION_PATH):
+    """Fit and write the calibration used for ``model.joblib`` (and versions without their own)."""
+    booster, _ = joblib_booster(model_path)
+    frames = {'validations': stored_holdout(root), 'reference': reference_holdout(dataset)}
+    calibration = calibrate(booster, FeatureEncoder(), frames)
+    with open(path, "w") as f:
+        json.dump(calibration, f)
+    return calibration
+
+
+def combined_loss(results):
+    rows = sum(r['rows'] for r in results.values())
+    return sum(r['log_loss'] * r['rows'] for r in results.values()) / rows
+
+
+def train_increment(store, root=MODELS_DIR, model_path="model.joblib", dataset="CVD_cleaned.csv",
+                    rounds=10, eta=None, min_rows=50, holdout_fraction=0.2, tolerance=0.0,
+                    lookback=1000, dry_run=False):
+    """Run one increment and return a summary dict (``published`` is the new version or None)."""
+    import pyarrow.feather as feather
+    import xgboost as xgb
+
+    root = Path(root)
+    encoder = FeatureEncoder()
+    booster, params, parent = base_model(root, model_path)
+    cursors = load_meta(parent, root)['cursors'] if parent else {}
+    frame, new_cursors = labelled_rows(store, cursors, lookback)
+    summary = {'parent': parent, 'cursors': new_cursors, 'rows': len(frame), 'published': None}
+    if len(frame) < min_rows:
+        summary['reason'] = f"only {len(frame)} new labelled rows (need {min_rows})"
+        return summary
+
+    held = frame['Name'].map(lambda name: _holdout(name, holdout_fraction))
+    train, new_holdout = frame[~held], frame[held]
+    holdout_path = root / "holdout.arrow"
+    holdout = pd.concat([feather.read_feather(holdout_path), new_holdout], ignore_index=True) \
+        if holdout_path.exists() else new_holdout
+    frames = {'validations': holdout.drop(columns='Name'), 'reference': reference_holdout(dataset)}
+
+    before = evaluate(booster, encoder, frames)
+    if eta is not None:
+        params = {**{k: v for k, v in params.items() if k != 'eta'}, 'learning_rate': eta}
+    dtrain = xgb.DMatrix(encoder.transform(train), label=train['label'].to_numpy(),
+                         feature_names=booster.feature_names or FEATURES)
+    candidate = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+    #Continued boosters inherit best_iteration, which would hide the new trees from predict
+    candidate.set_attr(best_iteration=None, best_score=None)
+
+    after = evaluate(candidate, encoder, frames)
+    summary.update({'train_rows': len(train), 'holdout_rows': len(holdout), 'before': before, 'after': after})
+    if combined_loss(after) > combined_loss(before) * (1 + tolerance):
+        summary['reason'] = "candidate log loss is worse than the current model's on the holdout"
+        return summary
+    if dry_run:
+        summary['reason'] = "dry run"
+        return summary
+
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = holdout_path.with_suffix(".tmp")
+    feather.write_feather(holdout.reset_index(drop=True), tmp, compression="uncompressed")
+    tmp.replace(holdout_path)
+    calibration = calibrate(candidate, encoder, frames)
+    meta = {'parent': parent, 'cursors': new_cursors, 'params': params, 'rounds': rounds,
+            'train_rows': len(train), 'metrics': after, 'previous_metrics': before, 'calibration': calibration}
+    summary['published'] = publish_version(candidate, meta, root, calibration=calibration)
+    summary['calibration'] = calibration
+    return summary
+
+
+def main(argv=None):
+    from storage import open_store
+
+    parser = argparse.ArgumentParser(description="Continue training the model on newly validated records.")
+    parser.add_argument('--models', default=str(MODELS_DIR), help="versioned model directory")
+    parser.add_argument('-m', '--model', default='model.joblib', help="base model before the first version")
+    parser.add_argument('--dataset', default='CVD_cleaned.csv', help="source of the reference holdout")
+    parser.add_argument('--store', default=None, help="record store backend (default: SILENT_HEART_STORE)")
+    parser.add_argument('--rounds', type=int, default=10, help="boosting rounds added per increment")
+    parser.add_argument('--eta', type=float, default=None, help="learning rate for the new trees")
+    parser.add_argument('--min-rows', type=int, default=50)
+    parser.add_argument('--tolerance', type=float, default=0.0, help="allowed relative holdout log loss increase")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--calibrate', action='store_true',
+                        help=f"only fit {CALIBRATION_PATH} for the base model on held-out rows and exit")
+    args = parser.parse_args(argv)
+
+    if args.calibrate:
+        print(json.dumps(calibrate_base(args.models, args.model, args.dataset), indent=2))
+        return 0
+
+    summary = train_increment(open_store(args.store), args.models, args.model, args.dataset, rounds=args.rounds,
+                              eta=args.eta, min_rows=args.min_rows, tolerance=args.tolerance,
+                              dry_run=args.dry_run)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Pure-NumPy evaluation of the XGBoost tree ensemble.
+
+``TreeEnsemble`` flattens every tree of a booster into a handful of global
+node arrays. Leaves point to themselves, so evaluating all rows against all
+trees is just ``max_depth`` rounds of vectorized gathers, with no Python-level
+recursion and no XGBoost runtime at inference time. Splits follow XGBoost's
+rules: go left when ``x < threshold``, and take the node's default direction
+when ``x`` is missing.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+ARRAYS = ('left', 'right', 'feature', 'threshold', 'default_left', 'value', 'roots')
+
+
+def _base_margin(learner):
+    base_score = learner['learner_model_param']['base_score'].strip('[]')
+    base_score = float(base_score)
+    if learner['objective']['name'] in ('binary:logistic', 'reg:logistic'):
+        return float(np.log(base_score / (1.0 - base_score)))
+    return base_score
+
+
+class TreeEnsemble:
+    """Flattened, read-only node arrays for a binary:logistic tree ensemble."""
+
+    def __init__(self, left, right, feature, threshold, default_left, value, roots,
+                 base_margin, max_depth, feature_names=None):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @classmethod
+    def from_booster(cls, booster, iteration_range=None):
+        """Flatten ``booster``; ``iteration_range`` limits the trees like ``predict`` does."""
+        model = json.loads(booster.save_raw(raw_format="json"))
+        learner = model['learner']
+        trees = learner['gradient_booster']['model']['trees']
+        if iteration_range and iteration_range[1] > 0:
+            per_iteration = int(learner['gradient_booster']['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees = trees[iteration_range[0] * per_iteration:iteration_range[1] * per_iteration]
+        parts = {name: [] for name in ARRAYS}
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            left = np.asarray(tree['left_children'], dtype=np.int32)
+            right = np.asarray(tree['right_children'], dtype=np.int32)
+            n = len(left)
+            leaf = left == -1
+            own = np.arange(n, dtype=np.int32)
+            parts['left'].append(np.where(leaf, own, left) + offset)
+            parts['right'].append(np.where(leaf, own, right) + offset)
+            parts['feature'].append(np.where(leaf, 0, tree['split_indices']).astype(np.int32))
+            parts['threshold'].append(np.asarray(tree['split_conditions'], dtype=np.float32))
+            parts['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+            parts['value'].append(np.where(leaf, tree['split_conditions'], 0).astype(np.float32))
+            parts['roots'].append(np.array([offset], dtype=np.int32))
+            max_depth = max(max_depth, _depth(left, right))
+            offset += n
+        arrays = {name: np.concatenate(values) for name, values in parts.items()}
+        return cls(**arrays, base_margin=_base_margin(learner), max_depth=max_depth,
+                   feature_names=booster.feature_names)
+
+    def margin(self, X, chunk_size=4096):
+        """Raw margin (log-odds) for each row of the float32 matrix ``X``."""
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_size):
+            block = X[start:start + chunk_size]
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+            for _ in range(self.max_depth):
+                x = block[rows, self.feature[node]]
+                go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[start:start + len(block)] = self.value[node].sum(axis=1, dtype=np.float64)
+        return out + self.base_margin
+
+    def predict_proba(self, X):
+        return 1.0 / (1.0 + np.exp(-self.margin(X)))
+
+    def predict(self, X):
+        return (self.margin(X) > 0).astype(int)
+
+    def save(self, path):
+        """Write the arrays and metadata to an uncompressed ``.npz`` file."""
+        meta = {'base_margin': self.base_margin, 'max_depth': self.max_depth,
+                'feature_names': self.feature_names}
+        np.savez(path, meta=np.array(json.dumps(meta)), **{name: getattr(self, name) for name in ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(**{name: data[name] for name in ARRAYS}, **meta)
+
+    def save_dir(self, directory):
+        """Write one ``.npy`` file per array plus ``meta.json``, so the arrays can be memory-mapped."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        meta = {'base_margin': self.base_margin, 'max_depth': self.max_depth,
+                'feature_names': self.feature_names}
+        with open(directory / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load_dir(cls, directory, mmap_mode="r"):
+        """Load arrays written by ``save_dir``; with ``mmap_mode`` they stay in the (shared) page cache."""
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        return cls(**{name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAYS}, **meta)
+
+
+def _depth(left, right):
+    depth = 0
+    level = [0]
+    while level:
+        children = [c for node in level for c in (left[node], right[node]) if c != -1]
+        if not children:
+            break
+        depth += 1
+        level = children
+    return depth
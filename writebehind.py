@@ -0,0 +1,236 @@
+"""Buffered write-behind queue for record logging.
+
+Rows are appended to a local SQLite spool and flushed in batches by a
+background thread to a sink, normally ``RecordStore.append`` from
+``storage``, so a prediction never waits on (or rewrites) the remote sheet.
+Every row carries an idempotency key: enqueuing the same key again before it
+is flushed replaces the pending row, and after it is flushed the duplicate is
+ignored. The key is also sent to the sink as a ``Key`` column, and the stores
+skip keys they already hold, so a batch that is resent after a crash between
+the sink write and marking it flushed is not stored twice. Flushing is serialized across processes that share the
+spool through a lease row, and failed batches stay in the spool and are
+retried with exponential backoff.
+
+When a batch fails, its rows are resent one at a time, so a single row the
+sink rejects does not hold back the others (unless the first resend fails
+too and nothing was flushed yet, which looks like the sink being down). Each
+failed send counts against that row. Rows are sent fewest attempts first, and a row that has failed
+``max_attempts`` times is left in the spool as a dead letter. Dead letters
+are no longer sent until ``requeue_dead_letters`` resets them.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+import metrics
+
+SPOOL_PATH = Path(os.environ.get("SILENT_HEART_SPOOL", Path(".cache") / "spool.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    key TEXT PRIMARY KEY,
+    worksheet TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    flushed REAL
+);
+CREATE INDEX IF NOT EXISTS spool_pending ON spool (flushed, worksheet, created);
+CREATE TABLE IF NOT EXISTS lease (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    owner TEXT,
+    expires REAL
+);
+"""
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class WriteBehindQueue:
+    """Durable SQLite spool drained in batches by a background worker."""
+
+    def __init__(self, sink, path=SPOOL_PATH, batch_size=100, interval=2.0,
+                 max_backoff=60.0, lease_seconds=30.0, retention=86400.0, max_attempts=5):
+        self.sink = sink
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def put(self, worksheet, row, key=None):
+        """Queue ``row`` (a mapping of column -> value) for ``worksheet``.
+
+        Returns False when ``key`` was already flushed and the row was ignored.
+        """
+        key = key or uuid.uuid4().hex
+        payload = json.dumps(row, default=_json_default)
+        with metrics.span("record queue", worksheet=worksheet), self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO spool (key, worksheet, payload, created) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, worksheet = excluded.worksheet "
+                "WHERE spool.flushed IS NULL",
+                (key, worksheet, payload, time.time()))
+            return cursor.rowcount > 0
+
+    def pending(self):
+        """Number of rows still to be sent (dead letters excluded)."""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM spool WHERE flushed IS NULL AND attempts < ?",
+                              (self.max_attempts,)).fetchone()[0]
+
+    def dead_letters(self):
+        """The rows that failed ``max_attempts`` times, as ``(key, worksheet, row, attempts)`` tuples."""
+        with self._connect() as db:
+            rows = db.execute("SELECT key, worksheet, payload, attempts FROM spool "
+                              "WHERE flushed IS NULL AND attempts >= ? ORDER BY created",
+                              (self.max_attempts,)).fetchall()
+        return [(key, worksheet, json.loads(payload), attempts) for key, worksheet, payload, attempts in rows]
+
+    def requeue_dead_letters(self):
+        """Reset the attempts of every dead letter so it is sent again. Returns how many were reset."""
+        with self._connect() as db:
+            return db.execute("UPDATE spool SET attempts = 0 WHERE flushed IS NULL AND attempts >= ?",
+                              (self.max_attempts,)).rowcount
+
+    def _acquire_lease(self, db):
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT owner, expires FROM lease WHERE id = 0").fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                db.execute("ROLLBACK")
+                return False
+            db.execute("INSERT OR REPLACE INTO lease (id, owner, expires) VALUES (0, ?, ?)",
+                       (self.owner, now + self.lease_seconds))
+            db.execute("COMMIT")
+            return True
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _release_lease(self, db):
+        db.execute("UPDATE lease SET expires = 0 WHERE id = 0 AND owner = ?", (self.owner,))
+
+    def _send(self, db, worksheet, batch):
+        """Send ``batch`` (key, payload pairs) to the sink and mark it flushed."""
+        keys = [key for key, _ in batch]
+        marks = ",".join("?" * len(keys))
+        with metrics.span("record flush", worksheet=worksheet):
+            self.sink(worksheet, pd.DataFrame([{**json.loads(payload), 'Key': key} for key, payload in batch]))
+        db.execute(f"UPDATE spool SET flushed = ? WHERE key IN ({marks})", [time.time(), *keys])
+        db.execute("UPDATE lease SET expires = ? WHERE id = 0 AND owner = ?",
+                   (time.time() + self.lease_seconds, self.owner))
+
+    def _failed(self, db, worksheet, key):
+        db.execute("UPDATE spool SET attempts = attempts + 1 WHERE key = ?", (key,))
+        attempts = db.execute("SELECT attempts FROM spool WHERE key = ?", (key,)).fetchone()[0]
+        if attempts >= self.max_attempts:
+            metrics.inc("silent_heart_dead_letters_total", worksheet=worksheet)
+
+    def flush(self):
+        """Send every pending row to the sink. Returns the number of rows flushed.
+
+        Raises the sink's exception if a row fails; that row stays queued (rows
+        sent before it in the failed batch are flushed).
+        """
+        flushed = 0
+        with self._connect() as db:
+            if not self._acquire_lease(db):
+                return 0
+            try:
+                while True:
+                    rows = db.execute(
+                        "SELECT key, worksheet, payload FROM spool WHERE flushed IS NULL AND attempts < ? "
+                        "ORDER BY attempts, worksheet, created LIMIT ?",
+                        (self.max_attempts, self.batch_size)).fetchall()
+                    if not rows:
+                        break
+                    worksheet = rows[0][1]
+                    batch = [(key, payload) for key, sheet, payload in rows if sheet == worksheet]
+                    try:
+                        self._send(db, worksheet, batch)
+                    except Exception:
+                        if len(batch) == 1:
+                            self._failed(db, worksheet, batch[0][0])
+                            raise
+                        #Find the rows the sink rejects; the others still go out
+                        error = None
+                        for row in batch:
+                            try:
+                                self._send(db, worksheet, [row])
+                            except Exception as exc:
+                                self._failed(db, worksheet, row[0])
+                                error = error or exc
+                                if not flushed:
+                                    #Nothing has gone out yet: the sink may be down, so don't send the rest
+                                    raise
+                                continue
+                            flushed += 1
+                        if error is not None:
+                            raise error
+                        continue
+                    flushed += len(batch)
+                db.execute("DELETE FROM spool WHERE flushed IS NOT NULL AND flushed < ?",
+                           (time.time() - self.retention,))
+            finally:
+                self._release_lease(db)
+        return flushed
+
+    def _run(self):
+        #Rows queued during the wait are coalesced into the next batch
+        backoff = self.interval
+        while not self._stop.wait(backoff):
+            try:
+                self.flush()
+                backoff = self.interval
+            except Exception:
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self):
+        """Start the background flusher (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=10.0):
+        """Stop the worker and make a final flush attempt."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:
+            pass